@@ -1,18 +1,26 @@
 import numpy as np
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from io import BytesIO
-from PIL import Image
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 import time
 import base64
 from streamlit_extras.stylable_container import stylable_container
-import pdfkit
-from datetime import datetime
-import re
+from components.cleaning import clean_data, missing_value_details, read_csv_upload
+from components.streaming import clean_csv_in_chunks
+from components.disk_cache import CleanedDataCache
+from components.charts import AGGREGATED_CHARTS, AGGREGATIONS, CHART_TYPES, build_chart
+from components.chart_images import ChartImage
+from components.chart_summary import summarize_chart_data
+from components.renderer_pool import RendererPool
+from components.gemini import GeminiClient
+from components.insight_cache import InsightCache
+from components.lru_cache import LRUCache
+from components.pdf_report import build_pdf_report
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 
 # Set Streamlit page configuration
@@ -108,160 +116,290 @@ api_key = os.getenv("GOOGLE_API_KEY")
 if api_key:
     genai.configure(api_key=api_key)
 
-# Function to convert a plotly figure to binary data
-def fig_to_pil(fig):
-    buf = BytesIO()
-    fig.write_image(buf, format="png")
-    buf.seek(0)
-    return Image.open(buf)
+# Gemini model used for chart analysis
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+# Limits shared by every session: deadline per attempt and per request (retries and throttling included),
+# retries of transient errors, requests per minute (0 for no limit)
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+GEMINI_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", "120"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_RATE_PER_MINUTE = int(os.getenv("GEMINI_RATE_PER_MINUTE", "60"))
+# After this many failures in a row, requests fail fast for GEMINI_BREAKER_RESET_SECONDS before one is tried again
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+# Image sent for analysis: longer side in pixels, format (jpeg, webp or png) and size budget in kilobytes (0 for none)
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "512"))
+VISION_FORMAT = os.getenv("VISION_FORMAT", "jpeg").lower()
+VISION_MAX_KB = int(os.getenv("VISION_MAX_KB", "16"))
+# What the AI is given about a chart: "image", "summary" (a text digest of the plotted data only) or "both"
+AI_CONTEXT = os.getenv("AI_CONTEXT", "both").lower()
+# Requests sent to the model at once when all charts of a session are analyzed together
+AI_BATCH_CONCURRENCY = int(os.getenv("AI_BATCH_CONCURRENCY", "4"))
+# Show AI insights piece by piece as they are generated instead of waiting for the full response
+STREAM_INSIGHTS = os.getenv("STREAM_INSIGHTS", "true").lower() in ("1", "true", "yes")
+# Generated insights are kept in SQLite for this many hours (0 disables the cache), within a size budget in megabytes
+INSIGHT_CACHE_PATH = os.getenv("INSIGHT_CACHE_PATH", os.path.join(".cache", "insights.sqlite3"))
+INSIGHT_CACHE_TTL_HOURS = float(os.getenv("INSIGHT_CACHE_TTL_HOURS", "168"))
+INSIGHT_CACHE_MAX_MB = int(os.getenv("INSIGHT_CACHE_MAX_MB", "64"))
+
+# Memory budget for cleaned DataFrames kept across reruns (in megabytes)
+DATAFRAME_CACHE_MAX_MB = int(os.getenv("DATAFRAME_CACHE_MAX_MB", "1024"))
+# Outlier removal strategy: "combined" (one pass, one mask) or "sequential" (legacy per-column filtering)
+OUTLIER_MODE = os.getenv("OUTLIER_MODE", "combined")
+# Uploads larger than this (in megabytes) are parsed and cleaned in chunks of CSV_CHUNK_ROWS rows
+STREAMING_THRESHOLD_MB = int(os.getenv("STREAMING_THRESHOLD_MB", "100"))
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "100000"))
+# CSV parser for uploads below the streaming threshold: "c" (pandas + convert_dtypes) or "pyarrow"
+CSV_ENGINE = os.getenv("CSV_ENGINE", "c")
+# Default point budget for Line and Scatter charts; larger data is downsampled before plotting
+MAX_CHART_POINTS = int(os.getenv("MAX_CHART_POINTS", "5000"))
+# Line and Scatter charts with more points than this are rendered with WebGL (Scattergl) instead of SVG
+WEBGL_THRESHOLD = int(os.getenv("WEBGL_THRESHOLD", "1000"))
+# Scatter plots of more rows than this are drawn as a server-side density heatmap
+RASTERIZE_THRESHOLD = int(os.getenv("RASTERIZE_THRESHOLD", "2000000"))
+# Memory budget for generated figures (measured by their serialized size, in megabytes)
+FIGURE_CACHE_MAX_MB = int(os.getenv("FIGURE_CACHE_MAX_MB", "256"))
+# Warm Kaleido processes kept for static image export (0 exports in the Streamlit process instead)
+RENDERER_POOL_SIZE = int(os.getenv("RENDERER_POOL_SIZE", "2"))
+# Threads shared by all sessions for image export, Gemini calls and PDF generation
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "4"))
+# PDF report renderer: "fpdf" (in process) or "pdfkit" (wkhtmltopdf subprocess)
+PDF_BACKEND = os.getenv("PDF_BACKEND", "fpdf")
+# Number of distinct charts remembered per session
+CHART_HISTORY_SIZE = 10
+# Cleaned datasets are also persisted here as Parquet so they survive restarts (size budget in megabytes)
+CLEANED_CACHE_DIR = os.getenv("CLEANED_CACHE_DIR", os.path.join(".cache", "cleaned"))
+CLEANED_CACHE_MAX_MB = int(os.getenv("CLEANED_CACHE_MAX_MB", "2048"))
 
 # Function to get response from Gemini AI API
-def get_gemini_response(input_text, image):
+# The client and insight cache are passed in because this runs on a background thread,
+# where the st.cache_resource getters have no script run context
+def get_gemini_response(client, cache, input_text, image, cache_key=None, on_text=None):
+    # Identical analyses (same image, prompt and model) are answered from the insight cache
+    if not cache_key:
+        cache = None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            if on_text is not None:
+                on_text(cached)
+            return cached
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")  # Use the correct model ID
         if input_text and image:
-            response = model.generate_content([input_text, image])
+            parts = [input_text, image]
         elif input_text:
-            response = model.generate_content([input_text])
+            parts = [input_text]
         else:
-            response = None
-        return response.text if response else "No response available."
+            return "No response available."
+        if on_text is None:
+            text = client.generate(parts).text
+        else:
+            # Hand each piece over as soon as it arrives so the page can show it while the rest is generated
+            pieces = []
+            for piece in client.stream(parts):
+                pieces.append(piece)
+                on_text(piece)
+            text = "".join(pieces)
+        if not text:
+            return "No response available."
     except Exception as e:
         return f"Error in generating response: {e}"
+    if cache is not None:
+        cache.put(cache_key, text, GEMINI_MODEL)
+    return text
 
-def fig_to_base64(fig):
-    buf = BytesIO()
-    fig.write_image(buf, format='png')
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.getvalue()).decode('ascii')
-    return image_base64
-
-def create_pdf(html_content):
-    """Generates a PDF file from HTML content and returns a bytes object."""
-    options = {
-        'quiet': ''
-    }
-    pdf = pdfkit.from_string(html_content, False, options=options)
-    return pdf
-
-def prepare_html(insights, chart_base64):
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    formatted_insights = format_insights(insights)
-    html_content = f"""
-    <html>
-    <head>
-        <title>AI Insights Report</title>
-    </head>
-    <body>
-        <h1>AI Insights Report</h1>
-        <p>Generated on {current_time}</p>
-        <h2>Insights:</h2>
-        <div>{formatted_insights}</div>
-        <img src="data:image/png;base64,{chart_base64}" alt="Chart" style="width:100%;">
-    </body>
-    </html>
-    """
-    return html_content
+def generate_and_download_pdf(insights, chart_image):
+    pdf_bytes = build_pdf_report(insights, chart_image.png(), backend=PDF_BACKEND)
+    b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
+    href = f'<a href="data:application/pdf;base64,{b64_pdf}" download="AI_Insights_Report.pdf">Download PDF</a>'
+    return href
 
 
-def format_insights(insights):
-    """Formats the insights into HTML content based on specific rules."""
-    insights_lines = insights.split('\n')
-    formatted_insights = ""
-    list_started = False
+# Function to fingerprint an upload together with the cleaning options applied to it
+def dataset_fingerprint(file_bytes, options):
+    hasher = hashlib.sha256(file_bytes)
+    hasher.update(repr(sorted(options.items())).encode())
+    return hasher.hexdigest()
 
-    for line in insights_lines:
-        line = line.strip()
 
-        # Handle bold formatting surrounded by double asterisks
-        line = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', line)
+# Function to measure a cached cleaning result: the cleaned frame plus its missing-value mask
+def cleaned_data_size(entry):
+    df, _, details = entry
+    return int(df.memory_usage(deep=True).sum()) + int(details["missing_values"].memory_usage(deep=True).sum())
 
-        # Determine the type of formatting based on the start of the line
-        if line.startswith('* '):
-            if not list_started:
-                formatted_insights += "<ul>"
-                list_started = True
-            line = f"<li>{line[2:]}</li>"  # Remove '* ' and wrap in <li>
-        else:
-            if list_started:
-                formatted_insights += "</ul>"
-                list_started = False
-            if line.startswith('*'):
-                line = f"<br>{line[1:]}"  # Remove '*' and add a break
-            else:
-                line = f"<p>{line}</p>"
 
-        formatted_insights += line
+# Function to measure a cached figure by its serialized JSON
+def figure_size(entry):
+    return len(entry[0].to_json())
 
-    if list_started:  # Close the list if it was started
-        formatted_insights += "</ul>"
 
-    return formatted_insights
+# Shared across reruns and sessions so the same upload is only parsed and cleaned once
+@st.cache_resource
+def get_dataframe_cache():
+    return LRUCache(DATAFRAME_CACHE_MAX_MB * 1024 * 1024, cleaned_data_size)
 
 
-def generate_and_download_pdf(insights, chart):
-    chart_base64 = fig_to_base64(chart)
-    html_content = prepare_html(insights, chart_base64)
-    pdf_bytes = create_pdf(html_content)
-    b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-    href = f'<a href="data:application/pdf;base64,{b64_pdf}" download="AI_Insights_Report.pdf">Download PDF</a>'
-    return href
+@st.cache_resource
+def get_figure_cache():
+    return LRUCache(FIGURE_CACHE_MAX_MB * 1024 * 1024, figure_size)
 
 
-# Function to clean data with detailed reporting
-def clean_data(df):
-    cleaning_report = []
-    original_shape = df.shape
+# Started once per server process, on the first script run, so Chromium is warm before the first export
+@st.cache_resource
+def get_renderer_pool():
+    if RENDERER_POOL_SIZE <= 0:
+        return None
+    return RendererPool(size=RENDERER_POOL_SIZE).start()
 
-    # Remove commas and convert numeric columns
-    for col in df.columns:
-        if pd.api.types.is_string_dtype(df[col]):
-            # Capitalize the first letter of each cell in string columns
-            df[col] = df[col].str.capitalize()
-            cleaning_report.append(f"Capitalized first letter of each cell in column '{col}'.")
 
-            try:
-                df[col] = df[col].str.replace(',', '').astype(float)
-                cleaning_report.append(f"Converted column '{col}' to float.")
-            except ValueError:
-                # If conversion fails, check for date conversion
-                try:
-                    df[col] = pd.to_datetime(df[col])
-                    cleaning_report.append(f"Converted column '{col}' to datetime.")
-                except ValueError:
-                    # If conversion to date also fails, keep the column as string
-                    pass
-
-    # Remove duplicates
-    df_before = df.copy()
-    df.drop_duplicates(inplace=True)
-    if df.shape[0] < df_before.shape[0]:
-        cleaning_report.append(f"Removed {df_before.shape[0] - df.shape[0]} duplicate rows.")
-
-    # Handle missing values with detailed reporting
-    for col in df.columns:
-        missing_count = df[col].isnull().sum()
-        if missing_count > 0:
-            df_missing = df[df[col].isnull()]
-            for index, row in df_missing.iterrows():
-                cleaning_report.append(f"Line {index + 1} in header '{col}' has no value: removed the line.")
-            df.dropna(subset=[col], inplace=True)  # Removing rows with NaN in specific column
-
-    # Identify and remove outliers with basic method (e.g., Z-score method)
-    for col in df.select_dtypes(include=[float, int]).columns:
-        mean = df[col].mean()
-        std = df[col].std()
-        cutoff = std * 3
-        lower, upper = mean - cutoff, mean + cutoff
-        outliers = df[(df[col] < lower) | (df[col] > upper)]
-        df = df[(df[col] >= lower) & (df[col] <= upper)]
-        if not outliers.empty:
-            cleaning_report.append(f"Removed {outliers.shape[0]} outliers in column '{col}'.")
-
-    cleaning_report.append(f"Original shape was {original_shape}, cleaned shape is {df.shape}.")
-    return df, cleaning_report
+# One Gemini client per process; the model itself is created on the first analysis
+@st.cache_resource
+def get_gemini_client():
+    return GeminiClient(
+        GEMINI_MODEL,
+        timeout=GEMINI_TIMEOUT_SECONDS,
+        deadline=GEMINI_DEADLINE_SECONDS,
+        max_retries=GEMINI_MAX_RETRIES,
+        rate_per_minute=GEMINI_RATE_PER_MINUTE,
+        breaker_threshold=GEMINI_BREAKER_THRESHOLD,
+        breaker_reset_seconds=GEMINI_BREAKER_RESET_SECONDS,
+    )
+
+
+@st.cache_resource
+def get_insight_cache():
+    return InsightCache(INSIGHT_CACHE_PATH, INSIGHT_CACHE_MAX_MB * 1024 * 1024, INSIGHT_CACHE_TTL_HOURS * 3600)
 
 
+@st.cache_resource
+def get_cleaned_data_cache():
+    return CleanedDataCache(CLEANED_CACHE_DIR, CLEANED_CACHE_MAX_MB * 1024 * 1024)
+
+
+def load_and_clean(uploaded_file, engine="c", **options):
+    """Parses and cleans an uploaded CSV, reusing the cached result for identical content.
+
+    Returns the cleaned frame, report and details plus the dataset fingerprint. The
+    DataFrame is shared with the cache and must be treated as read-only.
+    """
+    file_bytes = uploaded_file.getvalue()
+    # The parser is part of the key since it decides the dtypes of the cleaned frame
+    key = dataset_fingerprint(file_bytes, dict(options, engine=engine))
+    cache = get_dataframe_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return (*cached, key)
+
+    # A previous session (or server run) may already have cleaned this exact upload
+    disk_cache = get_cleaned_data_cache()
+    cached = disk_cache.get(key)
+    if cached is not None:
+        cache.put(key, cached)
+        return (*cached, key)
+
+    # The pyarrow parser cannot read in chunks, so large uploads always stream through the C parser
+    if len(file_bytes) > STREAMING_THRESHOLD_MB * 1024 * 1024:
+        df, cleaning_report, cleaning_details = clean_csv_in_chunks(file_bytes, CSV_CHUNK_ROWS, **options)
+    else:
+        df = read_csv_upload(BytesIO(file_bytes), engine=engine)
+        df, cleaning_report, cleaning_details = clean_data(df, **options)
+    cache.put(key, (df, cleaning_report, cleaning_details))
+    disk_cache.put(key, df, cleaning_report, cleaning_details)
+    return df, cleaning_report, cleaning_details, key
+
+
+# Shared by all sessions so image export, Gemini calls and PDF rendering never block the script thread
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="datagenie-background")
+
+
+def submit_task(name, fn, *args):
+    """Runs fn(*args) in the shared executor and tracks its future in the session under name."""
+    tasks = st.session_state.background_tasks
+    if name not in tasks:
+        tasks[name] = get_executor().submit(fn, *args)
+
+
+def pop_finished_task(name):
+    """Returns (and stops tracking) the future for name once it is done, or None while it is running."""
+    future = st.session_state.background_tasks.get(name)
+    if future is None or not future.done():
+        return None
+    return st.session_state.background_tasks.pop(name)
+
+
+# Re-runs on its own twice a second while work is pending, and reruns the page once something finishes
+@st.fragment(run_every=0.5)
+def poll_background_tasks():
+    tasks = st.session_state.background_tasks
+    if any(future.done() for future in tasks.values()):
+        st.rerun()
+    # Show the insights streamed so far; the finished text replaces them on the next full rerun
+    streamed = "".join(st.session_state.insight_stream)
+    if "ai_insights" in tasks and streamed:
+        st.subheader("AI Insights:")
+        st.markdown(f"<p class='ai-insights-text'>{streamed}</p>", unsafe_allow_html=True)
+    labels = {"ai_insights": "Analyzing the chart", "batch_insights": "Analyzing all charts", "pdf": "Preparing the PDF"}
+    for name in tasks:
+        st.caption(f"⏳ {labels.get(name, name)}... Please wait.")
+
+
+def prepare_analysis(chart_image, df=None, chart_info=None):
+    """Returns the prompt, the image part (None when only the data summary is sent) and a description of the image."""
+    prompt = "Analyze this chart"
+    # A digest of the plotted data grounds the analysis in exact figures, and can replace the image entirely
+    if AI_CONTEXT != "image" and df is not None:
+        summary = summarize_chart_data(df, chart_info)
+        if AI_CONTEXT == "summary":
+            return f"Analyze the chart described by this summary of its data:\n{summary}", None, None
+        prompt = f"{prompt}\n\nSummary of the data behind it:\n{summary}"
+    # Send a downscaled, compressed copy of the chart rather than the full-size PNG
+    data, mime_type, payload = chart_image.vision(VISION_MAX_SIDE, VISION_FORMAT, VISION_MAX_KB * 1024 or None)
+    return prompt, {"mime_type": mime_type, "data": data}, payload
+
+
+def insight_cache_key(prompt, image):
+    if INSIGHT_CACHE_TTL_HOURS <= 0:
+        return None
+    return InsightCache.key(image["data"] if image else None, prompt, GEMINI_MODEL)
+
+
+def analyze_chart(client, cache, chart_image, df=None, chart_info=None, on_text=None):
+    """Returns the insights and a description of the image payload that was sent (None without an image)."""
+    prompt, image, payload = prepare_analysis(chart_image, df, chart_info)
+    text = get_gemini_response(client, cache, prompt, image, cache_key=insight_cache_key(prompt, image), on_text=on_text)
+    return text, payload
+
+
+def analyze_charts(client, cache, entries, df, dataset_key):
+    """Analyzes several generated charts concurrently; returns one result dict per entry, in the same order."""
+    results = []
+    pending = []
+    for entry in entries:
+        chart_df = df if entry["key"][0] == dataset_key else None
+        prompt, image, _ = prepare_analysis(entry["image"], chart_df, entry["info"])
+        cache_key = insight_cache_key(prompt, image)
+        cached = cache.get(cache_key) if cache_key else None
+        results.append({"info": entry["info"], "text": cached, "seconds": None})
+        if cached is None:
+            pending.append((len(results) - 1, [prompt, image] if image else [prompt], cache_key))
+
+    # Only the charts missing from the insight cache go to the model, AI_BATCH_CONCURRENCY at a time
+    responses = client.generate_many([parts for _, parts, _ in pending], AI_BATCH_CONCURRENCY)
+    for (index, _, cache_key), (text, seconds) in zip(pending, responses):
+        results[index]["seconds"] = seconds
+        if isinstance(text, Exception):
+            results[index]["text"] = f"Error in generating response: {text}"
+        else:
+            results[index]["text"] = text
+            if cache_key:
+                cache.put(cache_key, text, GEMINI_MODEL)
+    return results
+
+get_renderer_pool()
+get_gemini_client()
+
 # Initialize session state variables
 if "active_menu" not in st.session_state:
     st.session_state.active_menu = "Visualize Data"
@@ -269,6 +407,10 @@ if "generated_charts" not in st.session_state:
     st.session_state.generated_charts = []
 if "chart_displayed" not in st.session_state:
     st.session_state.chart_displayed = False  # Ensure only one chart is displayed
+if "background_tasks" not in st.session_state:
+    st.session_state.background_tasks = {}  # Futures of work running in the shared executor, by name
+if "insight_stream" not in st.session_state:
+    st.session_state.insight_stream = []  # Pieces of the insights generated so far
 
 # STYLES
 st.markdown(
@@ -293,9 +435,22 @@ uploaded_file = st.file_uploader("Is your data ready for enchantment? 🧚‍♀
 
 
 if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
-    df = df.convert_dtypes()
-    df, cleaning_report = clean_data(df)
+    # Let the user pick key columns for duplicate detection before the data is cleaned
+    with st.expander("Cleaning options"):
+        header = pd.read_csv(BytesIO(uploaded_file.getvalue()), nrows=0).columns.tolist()
+        duplicate_keys = st.multiselect(
+            "Treat rows as duplicates when these columns match (leave empty to compare whole rows)",
+            options=header,
+        )
+        hash_duplicates = st.checkbox("Detect duplicates by hashing rows (faster on wide files)")
+
+    df, cleaning_report, cleaning_details, dataset_key = load_and_clean(
+        uploaded_file,
+        engine=CSV_ENGINE,
+        outlier_mode=OUTLIER_MODE,
+        duplicate_keys=tuple(duplicate_keys),
+        hash_duplicates=hash_duplicates,
+    )
 
     # Create two columns with equal width
     # Create two columns with equal width
@@ -366,6 +521,30 @@ if uploaded_file is not None:
                     f"<p class='report'>{report}</p>",
                     unsafe_allow_html=True,
                 )
+
+            # Show which inference path each text column took and how long it took
+            if cleaning_details["type_inference"]:
+                with st.expander("Type inference details"):
+                    inference = pd.DataFrame(cleaning_details["type_inference"])
+                    inference["ms"] = (inference.pop("seconds") * 1000).round(1)
+                    st.dataframe(inference, hide_index=True)
+
+            # Show the per-column memory footprint before and after dtype optimization
+            with st.expander("Memory usage"):
+                memory = cleaning_details["memory"]
+                st.dataframe((memory / 1024).round(1).rename(columns=lambda name: f"{name} (KB)"))
+                st.caption(f"Total: {memory['before'].sum() / 1024 ** 2:.2f} MB → {memory['after'].sum() / 1024 ** 2:.2f} MB")
+
+            # Build the per-cell missing-value export only when it is asked for
+            if not cleaning_details["missing_values"].empty:
+                if st.button("Export missing-value details"):
+                    details = missing_value_details(cleaning_details["missing_values"])
+                    st.download_button(
+                        "Download missing-value details (CSV)",
+                        data=details.to_csv(index=False),
+                        file_name="missing_values.csv",
+                        mime="text/csv",
+                    )
         else:
             st.markdown(
                 """
@@ -403,9 +582,20 @@ if uploaded_file is not None:
         y_axis = st.selectbox("Choose your Y column", options=column_options)
         chart_type = st.selectbox(
             "Any chart type in mind? 🤔",
-            ["Bar Chart", "Line Chart", "Scatter Plot", "Pie Chart", "Tree Map"],
+            CHART_TYPES,
         )
 
+        # Bar, Pie and Tree Map charts are drawn from one aggregated value per X category
+        aggregation, top_n = "Sum", None
+        if chart_type in AGGREGATED_CHARTS:
+            aggregation = st.selectbox("Combine Y values per category by", list(AGGREGATIONS))
+            top_n = st.number_input("Show the top categories (the rest are grouped as Other)", min_value=1, value=20)
+
+        # Line and Scatter charts over large data are downsampled to a point budget
+        max_points = None
+        if chart_type in ("Line Chart", "Scatter Plot"):
+            max_points = st.number_input("Maximum points to draw", min_value=100, value=MAX_CHART_POINTS, step=1000)
+
         # Move the button to the bottom of col1
         generate_chart = st.button("Generate Visualization")
 
@@ -421,20 +611,22 @@ if uploaded_file is not None:
                 unsafe_allow_html=True,
             )
             chart = None
-            if chart_type == "Bar Chart":
-                chart = px.bar(df, x=x_axis, y=y_axis)
-            elif chart_type == "Line Chart":
-                chart = px.line(df, x=x_axis, y=y_axis)
-            elif chart_type == "Scatter Plot":
-                chart = px.scatter(df, x=x_axis, y=y_axis)
-            elif chart_type == "Pie Chart":
-                chart = px.pie(df, names=x_axis, values=y_axis)
-            elif chart_type == "Tree Map":
-                if not pd.api.types.is_numeric_dtype(df[y_axis]):
-                    st.error("The Y-axis should consist of a column that is numeric, not text.")
-                    chart = None  # Prevent the chart from being created if the data type is incorrect
-                else:
-                    chart = px.treemap(df, path=[x_axis], values=y_axis)
+            chart_options = (
+                chart_type, x_axis, y_axis, aggregation, top_n, max_points, WEBGL_THRESHOLD, RASTERIZE_THRESHOLD,
+            )
+            chart_key = (dataset_key, *chart_options)
+            figure_cache = get_figure_cache()
+            cached_chart = figure_cache.get(chart_key)
+            if cached_chart is not None:
+                chart, chart_info, chart_image = cached_chart
+            else:
+                try:
+                    chart, chart_info = build_chart(df, *chart_options)
+                    # The static PNG is exported lazily, once, the first time AI analysis or the PDF needs it
+                    chart_image = ChartImage(chart, renderer=get_renderer_pool())
+                    figure_cache.put(chart_key, (chart, chart_info, chart_image))
+                except ValueError as e:
+                    st.error(str(e))  # Prevent the chart from being created if the data type is incorrect
 
             # Ensure the session state is initialized
             if "chart_displayed" not in st.session_state:
@@ -451,7 +643,15 @@ if uploaded_file is not None:
             # Chart generation logic
             if chart:
                 st.plotly_chart(chart, use_container_width=True)
-                st.session_state.generated_charts = [{"chart": chart}]  # Store the latest chart
+                if chart_info.get("downsampling"):
+                    st.caption(f"Showing {chart_info['points']:,} of {chart_info['rows']:,} points.")
+                elif chart_info.get("renderer") == "raster":
+                    width, height = chart_info["bins"]
+                    st.caption(f"Showing the density of {chart_info['rows']:,} points on a {width}×{height} grid.")
+                # Keep a short history of distinct charts; entries share the cached figure objects
+                history = [entry for entry in st.session_state.generated_charts if entry.get("key") != chart_key]
+                history.append({"key": chart_key, "chart": chart, "info": chart_info, "image": chart_image})
+                st.session_state.generated_charts = history[-CHART_HISTORY_SIZE:]  # The latest chart is last
                 st.session_state.chart_displayed = True
 
     col1, col2 = st.columns([5, 1])
@@ -472,70 +672,133 @@ if uploaded_file is not None:
             last_chart = st.session_state.generated_charts[-1]  # Get the last chart
             st.plotly_chart(last_chart["chart"], key="unique_chart")  # Display the chart once
 
+            # Pick up AI insights or a PDF that finished in the background since the last rerun
+            finished_analysis = pop_finished_task("ai_insights")
+            if finished_analysis is not None:
+                # get_gemini_response reports model errors itself; this catches failures preparing the image
+                try:
+                    response, st.session_state.insight_payload = finished_analysis.result()
+                except Exception as e:
+                    st.error(f"Error in analyzing the chart: {e}")
+                    response, st.session_state.insight_payload = None, None
+                if response:
+                    st.session_state.AI_insights = response  # Store the insights in session state
+                    st.session_state.ai_insights_displayed = True  # Mark insights as displayed
+                else:
+                    st.session_state.AI_insights = "No insights generated. Please try again."
+                    st.session_state.ai_insights_displayed = False
+                    st.markdown("<p class='ai-insights-text'>No insights generated. Please try again.</p>", unsafe_allow_html=True)
+                st.session_state.pdf_link = None  # A PDF of the previous insights is out of date
+
+                # Custom CSS to match your design theme
+                st.markdown(
+                    """
+                    <style>
+                    html, body, div, span, h1, h2, h3, h4, h5, h6, p, a, li, button, label, input, textarea, select {
+                        font-family: 'Poppins', sans-serif !important;
+                        color: #333333 !important; /* Ensures all text is easily visible */
+                    }
+                    </style>
+                    """,
+                    unsafe_allow_html=True
+                )
+
+            finished_batch = pop_finished_task("batch_insights")
+            if finished_batch is not None:
+                try:
+                    st.session_state.batch_insights = finished_batch.result()
+                except Exception as e:
+                    st.error(f"Error in analyzing the charts: {e}")
+
+            finished_pdf = pop_finished_task("pdf")
+            if finished_pdf is not None:
+                try:
+                    st.session_state.pdf_link = finished_pdf.result()
+                except Exception as e:
+                    st.error(f"Error in generating PDF: {e}")
+
             # Render existing AI insights if available
-            if st.session_state.get("ai_insights_displayed", False):
-                st.subheader("AI Insights:")
-                st.markdown(f"<p class='ai-insights-text'>{st.session_state.AI_insights}</p>", unsafe_allow_html=True)
+            insights_area = st.container()
+            if st.session_state.get("ai_insights_displayed", False) and "ai_insights" not in st.session_state.background_tasks:
+                with insights_area:
+                    st.subheader("AI Insights:")
+                    st.markdown(f"<p class='ai-insights-text'>{st.session_state.AI_insights}</p>", unsafe_allow_html=True)
+                    payload = st.session_state.get("insight_payload")
+                    if payload:
+                        st.caption(
+                            f"Chart sent as a {payload['width']}×{payload['height']} {payload['format'].upper()} "
+                            f"of {payload['bytes'] / 1024:.0f} KB (PNG: {payload['source_bytes'] / 1024:.0f} KB, "
+                            f"encoded in {payload['encode_seconds'] * 1000:.0f} ms)."
+                        )
 
             # Visualizer AI Section
             if st.button("Analyze Chart with AI"):
-                with st.spinner("Analyzing the chart... Please wait."):
-                    # Convert the chart to an image for analysis
-                    chart_image = fig_to_pil(last_chart["chart"])
-                    # AI-generated insights logic
-                    response = get_gemini_response("Analyze this chart", chart_image)
-
-                    # Custom CSS to match your design theme
-                    st.markdown(
-                        """
-                        <style>
-                        html, body, div, span, h1, h2, h3, h4, h5, h6, p, a, li, button, label, input, textarea, select {
-                            font-family: 'Poppins', sans-serif !important;
-                            color: #333333 !important; /* Ensures all text is easily visible */
-                        }
-                        </style>
-                        """,
-                        unsafe_allow_html=True
+                # Export and analysis run in the background so the page stays interactive
+                if "ai_insights" not in st.session_state.background_tasks:
+                    st.session_state.insight_stream = []
+                    on_text = st.session_state.insight_stream.append if STREAM_INSIGHTS else None
+                    # The data digest needs the dataset the chart was built from, which may have been replaced since
+                    chart_df = df if last_chart["key"][0] == dataset_key else None
+                    submit_task(
+                        "ai_insights",
+                        analyze_chart,
+                        get_gemini_client(),
+                        get_insight_cache(),
+                        last_chart["image"],
+                        chart_df,
+                        last_chart["info"],
+                        on_text,
                     )
 
-
-                    # Display the AI-generated insights with updated colors
-                    if response:
-                        st.session_state.AI_insights = response  # Store the insights in session state
-                        st.session_state.ai_insights_displayed = True  # Mark insights as displayed
-                        st.markdown(f"<p class='ai-insights-text'>{response}</p>", unsafe_allow_html=True)
-                    else:
-                        st.session_state.AI_insights = "No insights generated. Please try again."
-                        st.session_state.ai_insights_displayed = False
-                        st.markdown("<p class='ai-insights-text'>No insights generated. Please try again.</p>", unsafe_allow_html=True)
-
+            # Every chart kept in this session's history can be analyzed in one go
+            if len(st.session_state.generated_charts) > 1 and st.button("Analyze All Charts with AI"):
+                submit_task(
+                    "batch_insights",
+                    analyze_charts,
+                    get_gemini_client(),
+                    get_insight_cache(),
+                    list(st.session_state.generated_charts),
+                    df,
+                    dataset_key,
+                )
 
             # Button to trigger PDF generation
             if st.button("Generate PDF for AI Insight"):
                 if st.session_state.get("AI_insights") and st.session_state.get("generated_charts"):
-                    last_chart = st.session_state.generated_charts[-1]['chart']
-                    pdf_link = generate_and_download_pdf(st.session_state.AI_insights, last_chart)
-                    st.markdown(pdf_link, unsafe_allow_html=True)
-
-                    # Reapply the text color CSS right after generating the PDF
-                    st.markdown(
-                        """
-                        <style>
-                        html, body, div, span, h1, h2, h3, h4, h5, h6, p, a, li, button, label, input, textarea, select {
-                            color: #333333 !important; /* Dark grey text for better visibility */
-                        }
-                        .ai-insights-text {
-                            color: #333333 !important; /* Ensuring AI insights text remains visible */
-                        }
-                        </style>
-                        """,
-                        unsafe_allow_html=True
-                    )
+                    last_chart = st.session_state.generated_charts[-1]
+                    submit_task("pdf", generate_and_download_pdf, st.session_state.AI_insights, last_chart["image"])
                 else:
                     st.error("No insights or charts available to download. Please analyze and generate the chart first.")
 
+            if st.session_state.get("pdf_link"):
+                st.markdown(st.session_state.pdf_link, unsafe_allow_html=True)
 
+                # Reapply the text color CSS right after generating the PDF
+                st.markdown(
+                    """
+                    <style>
+                    html, body, div, span, h1, h2, h3, h4, h5, h6, p, a, li, button, label, input, textarea, select {
+                        color: #333333 !important; /* Dark grey text for better visibility */
+                    }
+                    .ai-insights-text {
+                        color: #333333 !important; /* Ensuring AI insights text remains visible */
+                    }
+                    </style>
+                    """,
+                    unsafe_allow_html=True
+                )
 
-
-
-
+            if st.session_state.get("batch_insights"):
+                with st.expander("Insights for all charts", expanded=True):
+                    for result in st.session_state.batch_insights:
+                        info = result["info"]
+                        st.markdown(f"**{info['chart_type']}: {info['y']} by {info['x']}**")
+                        st.markdown(f"<p class='ai-insights-text'>{result['text']}</p>", unsafe_allow_html=True)
+                        if result["seconds"] is None:
+                            st.caption("From the insight cache.")
+                        else:
+                            st.caption(f"Answered in {result['seconds']:.1f} s.")
+
+            if st.session_state.background_tasks:
+                with insights_area:
+                    poll_background_tasks()
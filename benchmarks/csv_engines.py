@@ -0,0 +1,91 @@
+"""Compares the C and pyarrow CSV engines used to parse uploads.
+
+Each engine runs in a fresh process so its peak RSS is measured in isolation.
+Run from the repository root:
+
+    python -m benchmarks.csv_engines --rows 1000000
+    python -m benchmarks.csv_engines --file path/to/export.csv
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from components.cleaning import read_csv_upload
+
+
+def write_sample_csv(path, rows, seed=0):
+    """Writes a mixed-type CSV resembling a sales export (labels, numbers, dates, free text)."""
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        "Region": rng.choice(["north", "south", "east", "west"], rows),
+        "Product": rng.choice([f"product {i}" for i in range(200)], rows),
+        "Units": rng.integers(1, 500, rows),
+        "Price": rng.normal(50, 12, rows).round(2),
+        "Revenue": rng.normal(10_000, 2_500, rows).round(2),
+        "Date": pd.date_range("2015-01-01", periods=rows, freq="min").strftime("%Y-%m-%d %H:%M:%S"),
+        "Comment": rng.choice(["on time", "late", "returned", None], rows),
+    }).to_csv(path, index=False)
+
+
+def peak_rss():
+    # Linux keeps ru_maxrss across exec, so the parent's peak would leak into the child's
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def parse(path, engine, results):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        df = read_csv_upload(f, engine=engine)
+    seconds = time.perf_counter() - start
+    results.put((seconds, peak_rss(), int(df.memory_usage(deep=True).sum())))
+
+
+def run(path, engine, repeat):
+    context = multiprocessing.get_context("spawn")
+    trials = []
+    for _ in range(repeat):
+        results = context.Queue()
+        process = context.Process(target=parse, args=(path, engine, results))
+        process.start()
+        trials.append(results.get())
+        process.join()
+    return min(trials)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows of the generated sample CSV")
+    parser.add_argument("--file", help="benchmark an existing CSV instead of a generated one")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = os.path.join(tmp, "sample.csv")
+            write_sample_csv(path, args.rows)
+        print(f"{path}: {os.path.getsize(path) / 1024 ** 2:.1f} MB, best of {args.repeat}")
+        print(f"{'engine':<10}{'seconds':>10}{'peak RSS MB':>14}{'frame MB':>12}")
+        for engine in ("c", "pyarrow"):
+            seconds, peak, frame = run(path, engine, args.repeat)
+            print(f"{engine:<10}{seconds:>10.3f}{peak / 1024 ** 2:>14.1f}{frame / 1024 ** 2:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
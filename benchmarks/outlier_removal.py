@@ -0,0 +1,78 @@
+"""Compares the sequential and combined outlier removal modes of clean_data.
+
+Run from the repository root:
+
+    python -m benchmarks.outlier_removal --rows 200000 --columns 50
+"""
+import argparse
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from components.cleaning import remove_outliers
+
+
+def make_frame(rows, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.normal(100, 15, size=(rows, columns))
+    # Sprinkle a few extreme values into every column
+    spikes = rng.integers(0, rows, size=(max(rows // 1000, 1), columns))
+    for col in range(columns):
+        data[spikes[:, col], col] *= 10
+    return pd.DataFrame(data, columns=[f"col_{i}" for i in range(columns)]).convert_dtypes()
+
+
+def run(df, mode, repeat):
+    # Count every operation that materializes frame data: boolean-mask filtering, selecting a
+    # list of columns, and converting to a NumPy array. Single-column access is not counted.
+    original_getitem = pd.DataFrame.__getitem__
+    original_to_numpy = pd.DataFrame.to_numpy
+    copies = 0
+    copied_bytes = 0
+
+    def record(result):
+        nonlocal copies, copied_bytes
+        copies += 1
+        copied_bytes += result.nbytes if isinstance(result, np.ndarray) else int(result.memory_usage(index=False).sum())
+        return result
+
+    def counting_getitem(self, key):
+        result = original_getitem(self, key)
+        if isinstance(key, (pd.Series, np.ndarray)) and pd.api.types.is_bool_dtype(key):
+            return record(result)
+        if isinstance(result, pd.DataFrame):
+            return record(result)
+        return result
+
+    def counting_to_numpy(self, *args, **kwargs):
+        return record(original_to_numpy(self, *args, **kwargs))
+
+    timings = []
+    with mock.patch.object(pd.DataFrame, "__getitem__", counting_getitem), \
+            mock.patch.object(pd.DataFrame, "to_numpy", counting_to_numpy):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cleaned, _ = remove_outliers(df, mode=mode)
+            timings.append(time.perf_counter() - start)
+    return cleaned.shape[0], copies // repeat, copied_bytes / repeat, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.columns)
+    print(f"{args.rows} rows x {args.columns} numeric columns, best of {args.repeat}")
+    print(f"{'mode':<12}{'rows kept':>12}{'copies':>10}{'MB copied':>12}{'seconds':>12}")
+    for mode in ("sequential", "combined"):
+        kept, copies, copied, seconds = run(df, mode, args.repeat)
+        print(f"{mode:<12}{kept:>12}{copies:>10}{copied / 1024 ** 2:>12.1f}{seconds:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
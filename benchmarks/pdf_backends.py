@@ -0,0 +1,96 @@
+"""Compares the PDF report backends: fpdf2 in process and pdfkit (wkhtmltopdf).
+
+Each backend runs in a fresh process so the memory a render adds on top of the loaded
+modules is measured in isolation; the wkhtmltopdf subprocess spawned by pdfkit is
+reported separately. Run from the
+repository root:
+
+    python -m benchmarks.pdf_backends --repeat 5
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from benchmarks.csv_engines import peak_rss
+from components.pdf_report import PDF_BACKENDS, build_pdf_report
+
+
+SAMPLE_INSIGHTS = """**Overview:** Units sold grew steadily over the period, with a sharp peak in the last quarter.
+* **North** leads every month and accounts for about a third of all units.
+* **West** is the most volatile region; its weekly totals swing by up to 40%.
+* Returns stay below 3% everywhere except the **South**, where they doubled in March.
+*Seasonality is visible around holidays, but the trend holds once it is removed.
+Consider restocking North earlier in the quarter and reviewing the South's returns."""
+
+
+def write_sample_chart(path, points=2000, seed=0):
+    """Exports a line chart like the ones the app generates, as PNG."""
+    # Imported here so the measured processes do not load Plotly
+    import numpy as np
+    import plotly.express as px
+
+    rng = np.random.default_rng(seed)
+    fig = px.line(x=np.arange(points), y=rng.normal(0, 1, points).cumsum())
+    fig.write_image(path, format="png")
+
+
+def children_peak_rss():
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def render(chart_path, backend, results):
+    with open(chart_path, "rb") as f:
+        chart_png = f.read()
+    baseline = peak_rss()
+    start = time.perf_counter()
+    try:
+        pdf = build_pdf_report(SAMPLE_INSIGHTS, chart_png, backend=backend)
+    except OSError as e:
+        results.put(str(e).splitlines()[0])
+        return
+    seconds = time.perf_counter() - start
+    results.put((seconds, peak_rss() - baseline, children_peak_rss(), len(pdf)))
+
+
+def run(chart_path, backend, repeat):
+    context = multiprocessing.get_context("spawn")
+    trials = []
+    for _ in range(repeat):
+        results = context.Queue()
+        process = context.Process(target=render, args=(chart_path, backend, results))
+        process.start()
+        trial = results.get()
+        process.join()
+        if isinstance(trial, str):
+            return trial
+        trials.append(trial)
+    return min(trials)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        chart_path = os.path.join(tmp, "chart.png")
+        write_sample_chart(chart_path)
+        print(f"chart: {os.path.getsize(chart_path) / 1024:.0f} KB PNG, best of {args.repeat}")
+        print(f"{'backend':<10}{'seconds':>10}{'added RSS MB':>14}{'child RSS MB':>14}{'PDF KB':>10}")
+        for backend in PDF_BACKENDS:
+            result = run(chart_path, backend, args.repeat)
+            if isinstance(result, str):
+                print(f"{backend:<10}unavailable: {result}")
+                continue
+            seconds, peak, child, size = result
+            print(f"{backend:<10}{seconds:>10.3f}{peak / 1024 ** 2:>14.1f}{child / 1024 ** 2:>14.1f}{size / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
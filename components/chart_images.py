@@ -0,0 +1,100 @@
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from components.renderer_pool import RenderError
+
+
+VISION_MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+# Lossy qualities tried in turn until the image fits the byte budget
+VISION_QUALITIES = (85, 75, 60, 45)
+# Images are not shrunk below this longer side to meet the budget; charts stop being legible
+VISION_MIN_SIDE = 384
+
+
+# Function to turn a chart PNG into the smaller image payload sent to the vision model
+def prepare_vision_image(png, max_side=512, image_format="jpeg", max_bytes=None):
+    """Returns (data, mime_type, info) for the chart scaled to at most max_side pixels on its longer side.
+
+    JPEG and WebP are encoded at decreasing quality, then at smaller sizes, until data fits
+    in max_bytes (when given). info records the payload size, dimensions and encode time.
+    """
+    if image_format not in VISION_MIME_TYPES:
+        raise ValueError(f"Unknown vision image format: {image_format!r}")
+    start = time.perf_counter()
+    image = Image.open(BytesIO(png))
+    if image_format != "png" and image.mode != "RGB":
+        # JPEG has no alpha channel: flatten onto white like the chart background
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+        image = background
+
+    side = max_side
+    while True:
+        resized = image.copy()
+        resized.thumbnail((side, side), Image.LANCZOS)
+        for quality in (None,) if image_format == "png" else VISION_QUALITIES:
+            buf = BytesIO()
+            resized.save(buf, format=image_format.upper(), **({} if quality is None else {"quality": quality}))
+            data = buf.getvalue()
+            if max_bytes is None or len(data) <= max_bytes:
+                break
+        if max_bytes is None or len(data) <= max_bytes or side <= VISION_MIN_SIDE:
+            break
+        side = max(int(side * 0.75), VISION_MIN_SIDE)
+
+    info = {
+        "format": image_format,
+        "width": resized.width,
+        "height": resized.height,
+        "quality": quality,
+        "bytes": len(data),
+        "source_bytes": len(png),
+        "encode_seconds": time.perf_counter() - start,
+    }
+    return data, VISION_MIME_TYPES[image_format], info
+
+
+class ChartImage:
+    """Static PNG rendering of a figure, exported at most once and shared by every consumer.
+
+    AI analysis needs a compact image and the PDF report embeds the PNG; both use the
+    same buffer instead of calling fig.write_image again. The export goes through the
+    warm renderer pool when one is given.
+    """
+
+    def __init__(self, chart, renderer=None):
+        self.chart = chart
+        self.renderer = renderer
+        self.render_seconds = None
+        self._png = None
+        self._vision = {}
+        self._lock = threading.Lock()
+
+    def png(self):
+        # The lock makes concurrent first requests wait for one export instead of starting several
+        with self._lock:
+            if self._png is None:
+                start = time.perf_counter()
+                self._png = self._render()
+                self.render_seconds = time.perf_counter() - start
+        return self._png
+
+    def _render(self):
+        if self.renderer is not None:
+            try:
+                return self.renderer.render(self.chart, format="png")
+            except RenderError:
+                pass  # Fall back to exporting in this process
+        buf = BytesIO()
+        self.chart.write_image(buf, format="png")
+        return buf.getvalue()
+
+    def vision(self, max_side=512, image_format="jpeg", max_bytes=None):
+        """The payload for the vision model as (data, mime_type, info); encoded once per setting."""
+        settings = (max_side, image_format, max_bytes)
+        if settings not in self._vision:
+            self._vision[settings] = prepare_vision_image(self.png(), max_side, image_format, max_bytes)
+        return self._vision[settings]
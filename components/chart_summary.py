@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from components.charts import AGGREGATED_CHARTS, aggregate_for_chart
+
+
+# Groups listed for Bar, Pie and Tree Map charts; the rest are folded into "Other"
+SUMMARY_TOP_GROUPS = 10
+QUANTILES = [0, 0.25, 0.5, 0.75, 1]
+
+
+def _format(value):
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(pd.Timestamp(value))
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        # Four significant digits, but large values in full rather than in scientific notation
+        return f"{value:,.0f}" if abs(value) >= 1000 else f"{value:.4g}"
+    return str(value)
+
+
+# Function to turn a column into floats for trend fitting (dates become days), or None if it has no scale
+def _as_numbers(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        days = (values - pd.Timestamp(0, tz=getattr(values.dtype, "tz", None))).dt.total_seconds() / 86400
+        return days.to_numpy(dtype=float, na_value=np.nan)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    return None
+
+
+# Function to describe one plotted column in a single line
+def _describe_column(values):
+    line = f"{values.name} ({values.dtype}, {values.isna().sum():,} missing)"
+    if _as_numbers(values) is None:
+        top = values.value_counts().head(5)
+        frequent = ", ".join(f"{label} ({count:,})" for label, count in top.items())
+        return f"{line}: {values.nunique():,} distinct values, most frequent {frequent}"
+    quantiles = values.quantile(QUANTILES)
+    line += ": min {}, p25 {}, median {}, p75 {}, max {}".format(*(_format(q) for q in quantiles))
+    if pd.api.types.is_numeric_dtype(values):
+        line += f", mean {_format(values.mean())}, std {_format(values.std())}"
+    return line
+
+
+# Function to build a short text digest of the data behind a chart for the AI model
+def summarize_chart_data(df, info, top_groups=SUMMARY_TOP_GROUPS):
+    """Describes the plotted columns of df in a few lines, using the chart info from build_chart.
+
+    Includes quantiles of each column, the aggregated values of the largest groups for
+    Bar, Pie and Tree Map charts, and the linear trend and correlation for Line and Scatter
+    charts. Everything is computed with vectorized pandas/numpy over all rows, so the model
+    gets exact figures instead of reading them off the image.
+    """
+    chart_type, x_axis, y_axis = info["chart_type"], info["x"], info["y"]
+    lines = [f"{chart_type} of {y_axis} by {x_axis}, built from {len(df):,} rows."]
+    lines += [_describe_column(df[column]) for column in dict.fromkeys((x_axis, y_axis))]
+
+    if chart_type in AGGREGATED_CHARTS:
+        aggregation = info.get("aggregation", "Sum")
+        data, value_column, aggregate_info = aggregate_for_chart(df, x_axis, y_axis, aggregation, top_groups)
+        if aggregate_info["groups"] <= top_groups:
+            data = data.sort_values(value_column, ascending=False)  # Already ordered when "Other" was added
+        groups = "; ".join(f"{label}: {_format(value)}" for label, value in zip(data[x_axis], data[value_column]))
+        lines.append(f"{aggregation} of {y_axis} for the {aggregate_info['groups']:,} groups of {x_axis}, largest first: {groups}")
+    else:
+        x, y = _as_numbers(df[x_axis]), _as_numbers(df[y_axis])
+        if x is not None and y is not None:
+            finite = np.isfinite(x) & np.isfinite(y)
+            x, y = x[finite], y[finite]
+            if len(x) > 1 and np.ptp(x) > 0 and np.ptp(y) > 0:
+                slope = np.polyfit(x, y, 1)[0]
+                unit = "per day" if pd.api.types.is_datetime64_any_dtype(df[x_axis]) else f"per unit of {x_axis}"
+                pearson = np.corrcoef(x, y)[0, 1]
+                spearman = np.corrcoef(pd.Series(x).rank(), pd.Series(y).rank())[0, 1]
+                lines.append(
+                    f"Linear trend of {y_axis}: {_format(slope)} {unit}; "
+                    f"Pearson correlation {pearson:.3f}, Spearman correlation {spearman:.3f}."
+                )
+    return "\n".join(lines)
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from components.downsampling import downsample_for_chart, rasterize_scatter
+
+
+CHART_TYPES = ["Bar Chart", "Line Chart", "Scatter Plot", "Pie Chart", "Tree Map"]
+# Charts that show one mark per category and are therefore built from grouped data
+AGGREGATED_CHARTS = {"Bar Chart", "Pie Chart", "Tree Map"}
+AGGREGATIONS = {"Sum": "sum", "Mean": "mean", "Count": "count"}
+OTHER_LABEL = "Other"
+# Grid (X cells, Y cells) used when a scatter plot is rasterized into a density heatmap
+RASTER_BINS = (400, 300)
+
+
+# Function to reduce a frame to one row per X category before plotting
+def aggregate_for_chart(df, x_axis, y_axis, aggregation="Sum", top_n=None):
+    """Groups df by x_axis and combines y_axis with the chosen aggregation.
+
+    When there are more than top_n categories, the largest top_n are kept and the rest
+    are folded into a single "Other (k categories)" row (a weighted mean for "Mean"),
+    so the figure carries at most top_n + 1 marks however many rows or categories the
+    data has. A real category named "Other" is kept apart from that row.
+    """
+    how = AGGREGATIONS[aggregation]
+    if how != "count" and not pd.api.types.is_numeric_dtype(df[y_axis]):
+        raise ValueError(f"{aggregation} needs a numeric Y column; choose Count to count rows instead.")
+
+    # The weighted mean for "Other" needs both the sums and the counts of each group
+    keys = df[x_axis].rename(None)
+    grouped = df.groupby(keys, observed=True)[y_axis].agg(["sum", "count"] if how == "mean" else [how])
+    values = grouped["sum"] / grouped["count"] if how == "mean" else grouped[how]
+
+    if top_n and len(values) > top_n:
+        top = values.nlargest(top_n).index
+        rest = grouped.drop(index=top)
+        other = rest["sum"].sum() / rest["count"].sum() if how == "mean" else rest[how].sum()
+        values = values.loc[top]
+        # Categories may be numbers or dates, so labels become strings once "Other" joins them
+        values.index = values.index.map(str)
+        # The data may have a real category of that name; the bucket must not overwrite it
+        other_label = f"{OTHER_LABEL} ({len(rest)} categories)"
+        while other_label in values.index:
+            other_label += " "
+        values.loc[other_label] = other
+
+    # Counting a column by itself needs a distinct name for the value column
+    value_column = y_axis if y_axis != x_axis else f"{aggregation} of {y_axis}"
+    aggregated = pd.DataFrame({x_axis: values.index, value_column: values.to_numpy()})
+    info = {"aggregation": aggregation, "groups": len(grouped), "marks": len(aggregated)}
+    return aggregated, value_column, info
+
+
+def _is_plottable_number(values):
+    return pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)
+
+
+# Function to draw a scatter plot as a heatmap of point counts
+def density_chart(df, x_axis, y_axis):
+    x_centers, y_centers, counts = rasterize_scatter(df, x_axis, y_axis, RASTER_BINS)
+    chart = go.Figure(go.Heatmap(
+        x=x_centers,
+        y=y_centers,
+        # Empty cells stay transparent so the grid reads like a scatter plot
+        z=np.where(counts > 0, counts, np.nan),
+        colorscale="Viridis",
+        colorbar={"title": "Points"},
+        hovertemplate=f"{x_axis}: %{{x}}<br>{y_axis}: %{{y}}<br>Points: %{{z}}<extra></extra>",
+    ))
+    chart.update_layout(xaxis_title=x_axis, yaxis_title=y_axis)
+    return chart
+
+
+# Function to build the Plotly figure for the selected chart type and columns
+def build_chart(df, chart_type, x_axis, y_axis, aggregation="Sum", top_n=None, max_points=None,
+                webgl_threshold=None, rasterize_threshold=None):
+    """Returns the figure and a dict describing how it was built (rows plotted, aggregation, renderer).
+
+    Line and Scatter charts with more than max_points rows are downsampled first, and are
+    drawn with WebGL instead of SVG when more than webgl_threshold points remain. Scatter
+    plots of numeric or date columns with more than rasterize_threshold rows are binned
+    into a density heatmap instead.
+    """
+    info = {"chart_type": chart_type, "x": x_axis, "y": y_axis, "rows": len(df)}
+
+    if chart_type in AGGREGATED_CHARTS:
+        if chart_type == "Tree Map" and aggregation != "Count" and not pd.api.types.is_numeric_dtype(df[y_axis]):
+            raise ValueError("The Y-axis should consist of a column that is numeric, not text.")
+        data, value_column, aggregate_info = aggregate_for_chart(df, x_axis, y_axis, aggregation, top_n)
+        info.update(aggregate_info)
+        if chart_type == "Bar Chart":
+            chart = px.bar(data, x=x_axis, y=value_column)
+        elif chart_type == "Pie Chart":
+            chart = px.pie(data, names=x_axis, values=value_column)
+        else:
+            chart = px.treemap(data, path=[x_axis], values=value_column)
+    elif chart_type == "Scatter Plot" and rasterize_threshold is not None and len(df) > rasterize_threshold \
+            and all(_is_plottable_number(df[col]) for col in (x_axis, y_axis)):
+        chart = density_chart(df, x_axis, y_axis)
+        info.update({"points": len(df), "downsampling": None, "renderer": "raster", "bins": RASTER_BINS})
+    elif chart_type in ("Line Chart", "Scatter Plot"):
+        data, method = df, None
+        if max_points:
+            data, method = downsample_for_chart(df, chart_type, x_axis, y_axis, max_points)
+        renderer = "webgl" if webgl_threshold is not None and len(data) > webgl_threshold else "svg"
+        info.update({"points": len(data), "downsampling": method, "renderer": renderer})
+        if chart_type == "Line Chart":
+            chart = px.line(data, x=x_axis, y=y_axis, render_mode=renderer)
+        else:
+            chart = px.scatter(data, x=x_axis, y=y_axis, render_mode=renderer)
+    else:
+        raise ValueError(f"Unknown chart type: {chart_type}")
+
+    return chart, info
+
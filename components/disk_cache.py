@@ -0,0 +1,229 @@
+"""On-disk Parquet cache of cleaned datasets, keyed by upload content hash.
+
+Inspect or purge the cache from the repository root:
+
+    python -m components.disk_cache list
+    python -m components.disk_cache prune --max-mb 512
+    python -m components.disk_cache purge
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import ArrowException
+
+
+# Bump whenever clean_data's output changes so stale entries are ignored
+CACHE_FORMAT_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.getenv("CLEANED_CACHE_DIR", os.path.join(".cache", "cleaned"))
+DEFAULT_CACHE_MAX_MB = int(os.getenv("CLEANED_CACHE_MAX_MB", "2048"))
+
+# Failures a cache read or write may run into; the cache is best-effort and never fails an upload
+CACHE_ERRORS = (OSError, ValueError, ArrowException)
+
+# Every entry is made of these files, sharing the content hash as their stem
+ENTRY_SUFFIXES = (".parquet", ".missing.parquet", ".json")
+
+
+# Function to describe a dtype precisely enough to rebuild it after a Parquet round trip
+def _dtype_spec(dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {"categories": _dtype_spec(dtype.categories.dtype), "ordered": bool(dtype.ordered)}
+    if isinstance(dtype, pd.ArrowDtype):
+        # "string[pyarrow]" would parse back as StringDtype, so Arrow types are kept apart
+        return {"arrow": str(dtype.pyarrow_dtype)}
+    if isinstance(dtype, pd.StringDtype):
+        # str() drops the storage, which Parquet does not keep either
+        return f"string[{dtype.storage}]"
+    return str(dtype)
+
+
+def _spec_dtype(spec):
+    if isinstance(spec, str):
+        return pd.api.types.pandas_dtype(spec)
+    if "arrow" in spec:
+        return pd.ArrowDtype(pa.type_for_alias(spec["arrow"]))
+    return pd.CategoricalDtype(ordered=spec["ordered"])
+
+
+# Function to give a frame read back from Parquet the dtypes it was written with
+def _restore_dtypes(df, schema):
+    for col, spec in schema.items():
+        if isinstance(spec, dict) and "categories" in spec:
+            categories = df[col].cat.categories.astype(_spec_dtype(spec["categories"]))
+            dtype = pd.CategoricalDtype(categories, ordered=spec["ordered"])
+            # Rebuild from the codes so values are not matched against the categories again
+            df[col] = pd.Categorical.from_codes(df[col].cat.codes, dtype=dtype)
+        else:
+            dtype = _spec_dtype(spec)
+            if df[col].dtype != dtype or type(df[col].dtype) is not type(dtype):
+                df[col] = df[col].astype(dtype)
+    return df
+
+
+class CleanedDataCache:
+    """Size-bounded directory of cleaned frames; least recently used entries are evicted first.
+
+    Each entry stores the cleaned frame and the missing-value mask as Parquet, and the
+    cleaning report with the remaining details as JSON. Reads bump the entry's
+    modification time, which is what the LRU order is based on.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key):
+        meta_path = self._path(key, ".json")
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("version") != CACHE_FORMAT_VERSION:
+                return None
+            df = _restore_dtypes(pd.read_parquet(self._path(key, ".parquet"), memory_map=True), meta["schema"])
+            missing_rows = pd.read_parquet(self._path(key, ".missing.parquet"), memory_map=True)
+            now = time.time()
+            for suffix in ENTRY_SUFFIXES:
+                os.utime(self._path(key, suffix), (now, now))
+        except CACHE_ERRORS:
+            # Also covers another session evicting the entry while it is being read
+            return None
+
+        details = {
+            "type_inference": meta["type_inference"],
+            "missing_values": missing_rows,
+            "memory": pd.DataFrame(meta["memory"]),
+        }
+        return df, meta["report"], details
+
+    def put(self, key, df, report, details):
+        """Stores an entry; returns False (leaving no partial files) if it could not be written."""
+        meta = {
+            "version": CACHE_FORMAT_VERSION,
+            "shape": list(df.shape),
+            # Parquet does not keep every pandas dtype exactly (string storage, category value types)
+            "schema": {col: _dtype_spec(dtype) for col, dtype in df.dtypes.items()},
+            "report": report,
+            "type_inference": details["type_inference"],
+            "memory": details["memory"].to_dict(),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to temporary names first so readers never see a half-written entry
+            df.to_parquet(self._path(key, ".parquet.tmp"))
+            details["missing_values"].to_parquet(self._path(key, ".missing.parquet.tmp"))
+            with open(self._path(key, ".json.tmp"), "w") as f:
+                json.dump(meta, f, default=str)
+            for suffix in ENTRY_SUFFIXES:
+                os.replace(self._path(key, suffix + ".tmp"), self._path(key, suffix))
+        except CACHE_ERRORS:
+            for suffix in ENTRY_SUFFIXES:
+                for path in (self._path(key, suffix + ".tmp"), self._path(key, suffix)):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            return False
+        try:
+            self.prune()
+        except CACHE_ERRORS:
+            pass  # The entry is stored; eviction is retried on the next write
+        return True
+
+    def entries(self):
+        """Returns one dict per cached dataset, most recently used first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            paths = [self._path(key, suffix) for suffix in ENTRY_SUFFIXES]
+            try:
+                with open(self._path(key, ".json")) as f:
+                    shape = json.load(f).get("shape")
+                entry = {
+                    "key": key,
+                    "bytes": sum(os.path.getsize(path) for path in paths),
+                    "last_used": os.path.getmtime(self._path(key, ".json")),
+                    "shape": shape,
+                }
+            except CACHE_ERRORS:
+                # Incomplete, unreadable or evicted by another session meanwhile
+                continue
+            entries.append(entry)
+        return sorted(entries, key=lambda entry: entry["last_used"], reverse=True)
+
+    def remove(self, key):
+        for suffix in ENTRY_SUFFIXES:
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def prune(self, max_bytes=None):
+        """Evicts least recently used entries until the cache fits in max_bytes; returns the evicted keys."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(entry["bytes"] for entry in entries)
+        evicted = []
+        while entries and total > max_bytes:
+            entry = entries.pop()
+            self.remove(entry["key"])
+            total -= entry["bytes"]
+            evicted.append(entry["key"])
+        return evicted
+
+    def purge(self):
+        evicted = [entry["key"] for entry in self.entries()]
+        for key in evicted:
+            self.remove(key)
+        return evicted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or purge the cleaned dataset cache.")
+    parser.add_argument("--dir", default=DEFAULT_CACHE_DIR, help=f"cache directory (default: {DEFAULT_CACHE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show cached datasets, most recently used first")
+    prune = commands.add_parser("prune", help="evict least recently used datasets beyond a size budget")
+    prune.add_argument("--max-mb", type=float, default=DEFAULT_CACHE_MAX_MB)
+    purge = commands.add_parser("purge", help="remove one dataset, or all of them")
+    purge.add_argument("key", nargs="?", help="content hash (or a unique prefix) of the dataset to remove")
+    args = parser.parse_args(argv)
+
+    cache = CleanedDataCache(args.dir)
+    if args.command == "list":
+        entries = cache.entries()
+        for entry in entries:
+            last_used = datetime.fromtimestamp(entry["last_used"]).strftime("%Y-%m-%d %H:%M:%S")
+            rows, cols = entry["shape"]
+            print(f"{entry['key'][:16]}  {entry['bytes'] / 1024 ** 2:10.2f} MB  {rows:>10} x {cols:<4}  {last_used}")
+        total = sum(entry["bytes"] for entry in entries)
+        print(f"{len(entries)} datasets, {total / 1024 ** 2:.2f} MB in {args.dir}")
+    elif args.command == "prune":
+        evicted = cache.prune(int(args.max_mb * 1024 * 1024))
+        print(f"Evicted {len(evicted)} datasets.")
+    elif args.key:
+        matches = [entry["key"] for entry in cache.entries() if entry["key"].startswith(args.key)]
+        if len(matches) != 1:
+            parser.error(f"{len(matches)} datasets match {args.key!r}")
+        cache.remove(matches[0])
+        print(f"Removed {matches[0]}.")
+    else:
+        print(f"Removed {len(cache.purge())} datasets.")
+
+
+if __name__ == "__main__":
+    main()
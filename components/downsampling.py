@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+
+# Function to turn an X column into plain floats that bucket boundaries can be computed on
+def _numeric_positions(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(float)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    # Categories and text have no distance between them, so points are spaced evenly
+    return np.arange(len(values), dtype=float)
+
+
+# Function to pick the points of a line that best preserve its visual shape
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: returns the positions of n_out points to keep.
+
+    x must be sorted. The first and last points are always kept; every bucket in
+    between contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        kept[i + 1] = previous
+    return kept
+
+
+# Function to keep the lowest and highest point of each bucket along X
+def minmax_indices(y, n_out):
+    """Splits the (x-sorted) points into n_out // 2 equal buckets and keeps each bucket's
+    minimum and maximum, which preserves the envelope and the outliers of a scatter.
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+
+    buckets = max(n_out // 2, 1)
+    bucket = np.arange(n) * buckets // n
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(buckets))
+    ends = np.append(starts[1:], n)
+    return np.unique(np.concatenate([order[starts], order[ends - 1]]))
+
+
+# Function to shrink a frame to at most max_points rows before building a Line or Scatter chart
+def downsample_for_chart(df, chart_type, x_axis, y_axis, max_points):
+    """Returns the rows to plot, sorted by X, and the name of the method used (None if untouched).
+
+    Line charts use LTTB; scatter plots keep the per-bucket min and max. A non-numeric Y
+    has no shape to preserve, so evenly spaced rows are kept instead.
+    """
+    data = df[[x_axis]] if x_axis == y_axis else df[[x_axis, y_axis]]
+    if len(data) <= max_points:
+        return data, None
+
+    data = data.sort_values(x_axis, kind="stable")
+    if not pd.api.types.is_numeric_dtype(data[y_axis]):
+        positions = np.linspace(0, len(data) - 1, max_points).astype(int)
+        return data.iloc[positions], "even"
+
+    y = data[y_axis].to_numpy(dtype=float)
+    if chart_type == "Line Chart":
+        positions = lttb_indices(_numeric_positions(data[x_axis]), y, max_points)
+        return data.iloc[positions], "lttb"
+    return data.iloc[minmax_indices(y, max_points)], "minmax"
+
+
+# Function to bin a very large scatter into a fixed-size 2D density grid
+def rasterize_scatter(df, x_axis, y_axis, bins):
+    """Counts points per cell of a bins[0] x bins[1] grid with np.histogram2d.
+
+    Returns the cell centers along X and Y (as datetimes when the column holds dates)
+    and the count matrix indexed [y, x], ready for a heatmap trace. The payload size
+    depends only on the grid, not on the number of points.
+    """
+    x = _numeric_positions(df[x_axis])
+    y = _numeric_positions(df[y_axis])
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    if pd.api.types.is_datetime64_any_dtype(df[x_axis]):
+        x_centers = pd.to_datetime(x_centers.astype(np.int64))
+    if pd.api.types.is_datetime64_any_dtype(df[y_axis]):
+        y_centers = pd.to_datetime(y_centers.astype(np.int64))
+    return x_centers, y_centers, counts.T
@@ -0,0 +1,263 @@
+import asyncio
+import math
+import random
+import threading
+import time
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+
+# Failures worth another attempt: throttling, overload and timeouts. Anything else (a bad
+# request, a missing permission) would fail the same way again.
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.GatewayTimeout,
+    TimeoutError,
+    ConnectionError,
+)
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 30
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while recent requests have kept failing."""
+
+
+class TokenBucket:
+    """Process-wide rate limiter: rate tokens per second, bursts of up to capacity requests."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token and returns how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is a queue of reservations, served in order as tokens refill
+            return max(0.0, -self._tokens / self.rate)
+
+
+class CircuitBreaker:
+    """Stops requests after `threshold` consecutive failures, then lets one through every reset_seconds."""
+
+    def __init__(self, threshold=5, reset_seconds=30):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        return "closed" if self._opened_at is None else "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(f"The AI service keeps failing; requests are paused for {math.ceil(remaining)} s.")
+            # Half-open: this request is the trial, the others keep waiting for its outcome
+            self._opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+
+
+class GeminiClient:
+    """One GenerativeModel shared by every session, created on first use.
+
+    The model keeps its API client (and the connection behind it) after the first
+    request, so reusing the instance avoids paying client setup on every analysis.
+    model_factory builds the model from the model id; pass a stub to run without the API.
+
+    Every request is governed the same way, whichever session sends it: a deadline of
+    timeout seconds per attempt and of deadline seconds for the whole request (throttling,
+    attempts and backoff included), up to max_retries retries of transient failures with
+    exponential backoff and full jitter, a token bucket of rate_per_minute requests
+    shared by the process, and a circuit breaker that fails fast while the API is down.
+    """
+
+    def __init__(self, model_id, model_factory=None, timeout=60, deadline=120, max_retries=3,
+                 rate_per_minute=None, breaker_threshold=5, breaker_reset_seconds=30):
+        self.model_id = model_id
+        self.model_factory = model_factory
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.limiter = TokenBucket(rate_per_minute / 60, max(1, rate_per_minute // 6)) if rate_per_minute else None
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self._model = None
+        self._loop = None
+        self._lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0,
+                          "throttled": 0, "throttled_seconds": 0.0}
+
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                factory = self.model_factory or genai.GenerativeModel
+                self._model = factory(self.model_id)
+            return self._model
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._counters[name] += amount
+
+    def metrics(self):
+        """Request, retry and failure counters, time spent throttled, and the circuit breaker state."""
+        with self._metrics_lock:
+            return dict(self._counters, circuit=self.breaker.state)
+
+    def _admit(self, attempt, deadline):
+        # Returns how long to wait before sending the request, never past its deadline
+        if attempt == 0:
+            # The breaker admits requests; one it let through may use all of its retries
+            try:
+                self.breaker.allow()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+        self._count("requests")
+        wait = self.limiter.reserve() if self.limiter else 0.0
+        if wait:
+            self._count("throttled")
+            self._count("throttled_seconds", wait)
+        return self._capped(wait, deadline)
+
+    def _capped(self, seconds, deadline):
+        return max(0.0, min(seconds, deadline - time.monotonic()))
+
+    def _attempt_timeout(self, deadline, attempt):
+        # The per-attempt timeout, shortened to what is left of the request's deadline
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._count("failures")
+            if attempt:
+                # Earlier attempts failed; the request as a whole counts as one failure
+                self.breaker.record_failure()
+            raise TimeoutError(f"The AI service did not answer within {self.deadline:g} s.")
+        return min(self.timeout, remaining)
+
+    def _failed(self, attempt, deadline):
+        # Returns how long to back off before retrying, or None when the failure is final
+        if attempt == self.max_retries:
+            self._count("failures")
+            # Only a request's final failure counts towards the breaker, so a burst of
+            # retried throttling errors from one request does not pause every session
+            self.breaker.record_failure()
+            return None
+        self._count("retries")
+        # Full jitter spreads the retries of many sessions instead of synchronizing them
+        backoff = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        return self._capped(backoff, deadline)
+
+    def _call(self, request):
+        deadline = time.monotonic() + self.deadline
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._admit(attempt, deadline))
+            timeout = self._attempt_timeout(deadline, attempt)
+            try:
+                result = request(timeout)
+            except RETRYABLE_ERRORS:
+                backoff = self._failed(attempt, deadline)
+                if backoff is None:
+                    raise
+                time.sleep(backoff)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def _call_async(self, request):
+        deadline = time.monotonic() + self.deadline
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self._admit(attempt, deadline))
+            timeout = self._attempt_timeout(deadline, attempt)
+            try:
+                result = await request(timeout)
+            except RETRYABLE_ERRORS:
+                backoff = self._failed(attempt, deadline)
+                if backoff is None:
+                    raise
+                await asyncio.sleep(backoff)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _options(self, options, timeout):
+        return {"request_options": {"timeout": timeout}, **options}
+
+    def generate(self, parts, **options):
+        """Sends the prompt parts (text and images) and returns the model's response."""
+        return self._call(lambda timeout: self.model().generate_content(parts, **self._options(options, timeout)))
+
+    def stream(self, parts, **options):
+        """Yields the response text piece by piece as the model generates it.
+
+        Only starting the response is retried; text already shown cannot be taken back.
+        """
+        response = self._call(
+            lambda timeout: self.model().generate_content(parts, stream=True, **self._options(options, timeout))
+        )
+        for chunk in response:
+            # Chunks without content (e.g. the final one carrying only the finish reason) have no text
+            if chunk.parts:
+                yield chunk.text
+
+    def _event_loop(self):
+        # The model's async client binds to the loop it is first used on, so every batch runs on this one
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="gemini-async", daemon=True).start()
+            return self._loop
+
+    def generate_many(self, requests, concurrency=4):
+        """Sends each list of prompt parts concurrently, with at most `concurrency` requests in flight.
+
+        Returns one (text, seconds) pair per request, in the order given. A failed request
+        gives the exception instead of the text; seconds is the latency of that call alone.
+        """
+        batch = self._generate_many(requests, concurrency)
+        return asyncio.run_coroutine_threadsafe(batch, self._event_loop()).result()
+
+    async def _generate_many(self, requests, concurrency):
+        model = self.model()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def generate(parts):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await self._call_async(
+                        lambda timeout: model.generate_content_async(parts, **self._options({}, timeout))
+                    )
+                    result = response.text
+                except Exception as e:
+                    result = e
+                return result, time.perf_counter() - start
+
+        return await asyncio.gather(*(generate(parts) for parts in requests))
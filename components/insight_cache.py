@@ -0,0 +1,125 @@
+"""SQLite cache of AI chart insights, keyed by the chart image, the prompt and the model.
+
+Inspect or purge the cache from the repository root:
+
+    python -m components.insight_cache stats
+    python -m components.insight_cache purge
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+
+
+DEFAULT_CACHE_PATH = os.getenv("INSIGHT_CACHE_PATH", os.path.join(".cache", "insights.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS insights (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+class InsightCache:
+    """Persistent store of generated insights shared by every session and process.
+
+    Entries older than ttl_seconds are treated as missing and deleted; beyond max_bytes
+    of stored text the least recently used entries are evicted. Every call opens its own
+    connection, so the cache can be used from the background executor's threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=64 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    @staticmethod
+    def key(image_bytes, prompt, model_id):
+        """Identifies one analysis: the exact image sent, the prompt text and the model id."""
+        digest = hashlib.sha256()
+        for part in (image_bytes or b"", prompt.encode(), model_id.encode()):
+            # Length prefixes keep ("ab", "c") and ("a", "bc") apart
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT text, created FROM insights WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM insights WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE insights SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key, text, model_id):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO insights VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_id, text, len(text.encode()), now, now),
+            )
+        self.prune()
+
+    def prune(self, max_bytes=None):
+        """Deletes expired entries, then least recently used ones beyond max_bytes; returns how many."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._connect() as conn:
+            expired = conn.execute("DELETE FROM insights WHERE created < ?", (time.time() - self.ttl_seconds,)).rowcount
+            evicted = conn.execute(
+                """
+                DELETE FROM insights WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(bytes) OVER (ORDER BY last_used DESC, key) AS kept FROM insights
+                    ) WHERE kept > ?
+                )
+                """,
+                (max_bytes,),
+            ).rowcount
+        return expired + evicted
+
+    def stats(self):
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM insights").fetchone()
+        return {"entries": count, "bytes": total}
+
+    def purge(self):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM insights").rowcount
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or purge the AI insight cache.")
+    parser.add_argument("--path", default=DEFAULT_CACHE_PATH, help=f"cache database (default: {DEFAULT_CACHE_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="show how many insights are cached")
+    commands.add_parser("purge", help="remove every cached insight")
+    args = parser.parse_args(argv)
+
+    cache = InsightCache(args.path)
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"{stats['entries']} insights, {stats['bytes'] / 1024:.1f} KB in {args.path}")
+    else:
+        print(f"Removed {cache.purge()} insights.")
+
+
+if __name__ == "__main__":
+    main()
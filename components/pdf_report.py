@@ -0,0 +1,107 @@
+import base64
+import html
+import re
+from datetime import datetime
+from io import BytesIO
+
+import pdfkit
+from fpdf import FPDF
+
+
+PDF_BACKENDS = ("fpdf", "pdfkit")
+# The built-in PDF fonts only cover Latin-1; common typographic characters get plain equivalents
+LATIN1_REPLACEMENTS = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+    "\u2013": "-", "\u2014": "-", "\u2022": "-", "\u2026": "...", "\u00a0": " ",
+})
+
+
+def create_pdf(html_content):
+    """Generates a PDF file from HTML content and returns a bytes object."""
+    options = {
+        'quiet': ''
+    }
+    pdf = pdfkit.from_string(html_content, False, options=options)
+    return pdf
+
+def prepare_html(insights, chart_base64):
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    formatted_insights = format_insights(insights)
+    html_content = f"""
+    <html>
+    <head>
+        <title>AI Insights Report</title>
+    </head>
+    <body>
+        <h1>AI Insights Report</h1>
+        <p>Generated on {current_time}</p>
+        <h2>Insights:</h2>
+        <div>{formatted_insights}</div>
+        <img src="data:image/png;base64,{chart_base64}" alt="Chart" style="width:100%;">
+    </body>
+    </html>
+    """
+    return html_content
+
+
+def format_insights(insights):
+    """Formats the insights into HTML content based on specific rules."""
+    insights_lines = insights.split('\n')
+    formatted_insights = ""
+    list_started = False
+
+    for line in insights_lines:
+        # Model text is untrusted (the prompt carries CSV values); only the markup added below is HTML
+        line = html.escape(line.strip())
+
+        # Handle bold formatting surrounded by double asterisks
+        line = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', line)
+
+        # Determine the type of formatting based on the start of the line
+        if line.startswith('* '):
+            if not list_started:
+                formatted_insights += "<ul>"
+                list_started = True
+            line = f"<li>{line[2:]}</li>"  # Remove '* ' and wrap in <li>
+        else:
+            if list_started:
+                formatted_insights += "</ul>"
+                list_started = False
+            if line.startswith('*'):
+                line = f"<br>{line[1:]}"  # Remove '*' and add a break
+            else:
+                line = f"<p>{line}</p>"
+
+        formatted_insights += line
+
+    if list_started:  # Close the list if it was started
+        formatted_insights += "</ul>"
+
+    return formatted_insights
+
+
+# Function to lay out the report with fpdf2 in this process, embedding the chart PNG as is
+def create_pdf_in_process(insights, chart_png, generated_on):
+    """Builds the same report as prepare_html + create_pdf without an HTML renderer or a subprocess."""
+    content = (
+        f"<h1>AI Insights Report</h1><p>Generated on {generated_on}</p>"
+        f"<h2>Insights:</h2>{format_insights(insights)}"
+    )
+    pdf = FPDF()
+    pdf.set_title("AI Insights Report")
+    pdf.add_page()
+    pdf.set_font("helvetica", size=11)
+    pdf.write_html(content.translate(LATIN1_REPLACEMENTS).encode("latin-1", "replace").decode("latin-1"))
+    pdf.image(BytesIO(chart_png), w=pdf.epw)
+    return bytes(pdf.output())
+
+
+# Function to render the AI insights report with the configured backend
+def build_pdf_report(insights, chart_png, backend="fpdf"):
+    """Returns the PDF bytes. "fpdf" renders in process; "pdfkit" goes through wkhtmltopdf."""
+    if backend == "pdfkit":
+        chart_base64 = base64.b64encode(chart_png).decode("ascii")
+        return create_pdf(prepare_html(insights, chart_base64))
+    if backend == "fpdf":
+        return create_pdf_in_process(insights, chart_png, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    raise ValueError(f"Unknown PDF backend: {backend}")
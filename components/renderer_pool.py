@@ -0,0 +1,268 @@
+import math
+import os
+import queue
+import secrets
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+
+
+class RenderError(RuntimeError):
+    """Raised when a figure could not be exported by any renderer process."""
+
+
+# Directory that holds the components package, used as the workers' working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTHKEY_ENV = "DATAGENIE_RENDERER_AUTHKEY"
+
+
+# Function run in each renderer process: keeps one Kaleido/Chromium instance warm and serves exports
+def _worker_main():
+    listener = Listener(authkey=bytes.fromhex(os.environ.pop(AUTHKEY_ENV)))
+    print(listener.address, flush=True)
+    # Nothing else may go to the pipe the parent read the address from
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    conn = listener.accept()
+
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    # The first export starts Chromium; do it now so user requests never pay for it
+    pio.to_image(go.Figure(), format="png")
+    try:
+        conn.send(("ready", None))
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            if message == "ping":
+                conn.send(("pong", None))
+                continue
+            figure_json, options = message
+            try:
+                conn.send(("ok", pio.to_image(pio.from_json(figure_json), **options)))
+            except Exception as e:
+                conn.send(("error", repr(e)))
+    except (EOFError, OSError):
+        pass  # The app went away; exit quietly
+
+
+class _Worker:
+    # Workers are separate interpreters rather than multiprocessing children: Streamlit runs
+    # app.py as __main__, which multiprocessing's spawn would re-execute in every child
+    def __init__(self, startup_timeout):
+        authkey = secrets.token_bytes(32)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "components.renderer_pool"],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, AUTHKEY_ENV: authkey.hex()},
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        address = self.process.stdout.readline().strip()
+        self.process.stdout.close()
+        self.conn = None
+        try:
+            self.conn = Client(address, authkey=authkey)
+            ready = self.conn.poll(startup_timeout) and self.conn.recv()[0] == "ready"
+        except (OSError, EOFError, ValueError):
+            ready = False
+        if not ready:
+            self.stop()
+            raise RenderError("Renderer process did not start in time.")
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def request(self, message, timeout):
+        self.conn.send(message)
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def stop(self):
+        if self.conn is not None:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self.conn.close()
+        try:
+            self.process.wait(1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class RendererPool:
+    """Pool of warm Kaleido renderer processes for static figure export.
+
+    render() queues for the next idle process, so concurrent sessions share the pool
+    instead of each cold-starting Chromium. A process that crashes or exceeds the
+    render timeout is replaced, and the request is retried once on the replacement.
+    A background thread pings idle processes every health_interval seconds and keeps
+    retrying slots whose process failed to start; render() fails fast while none runs.
+    """
+
+    def __init__(self, size=2, render_timeout=60, startup_timeout=60, health_interval=30):
+        self.size = size
+        self.render_timeout = render_timeout
+        self.startup_timeout = startup_timeout
+        self.health_interval = health_interval
+        self._idle = queue.Queue()
+        self._closed = threading.Event()
+        # Set once the first boot attempt for every slot has finished
+        self._booted = threading.Event()
+        self._live = 0
+        self._booting = 0
+        self._metrics_lock = threading.Lock()
+        self._durations = deque(maxlen=500)
+        self._counters = {"renders": 0, "failures": 0, "restarts": 0, "queue_wait_seconds": 0.0}
+
+    def start(self):
+        """Boots the renderer processes in the background; render() waits for the first one."""
+        threading.Thread(target=self._run, name="renderer-pool", daemon=True).start()
+        return self
+
+    def _run(self):
+        self._fill()
+        self._booted.set()
+        while not self._closed.wait(self.health_interval):
+            self.health_check()
+            self._fill()
+
+    def _fill(self):
+        # Boots a process for every empty slot; slots that fail stay empty until the next call
+        with self._metrics_lock:
+            missing = self.size - self._live - self._booting
+            self._booting += missing
+        for _ in range(missing):
+            worker = None
+            if not self._closed.is_set():
+                try:
+                    worker = _Worker(self.startup_timeout)
+                except RenderError:
+                    pass
+            with self._metrics_lock:
+                self._booting -= 1
+                if worker is None:
+                    self._counters["failures"] += 1
+                else:
+                    self._live += 1
+            if worker is not None:
+                self._idle.put(worker)
+
+    def _replace(self, worker):
+        # Returns None and gives up the slot when the new process does not start
+        worker.stop()
+        try:
+            replacement = _Worker(self.startup_timeout)
+        except RenderError:
+            replacement = None
+        with self._metrics_lock:
+            self._counters["restarts"] += 1
+            if replacement is None:
+                self._live -= 1
+        return replacement
+
+    def _acquire(self):
+        deadline = time.perf_counter() + self.startup_timeout + self.render_timeout
+        while True:
+            with self._metrics_lock:
+                unavailable = self._live == 0 and self._booting == 0
+            if unavailable and self._booted.is_set():
+                raise RenderError("No renderer process is running.")
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise RenderError("No renderer process became available.")
+            try:
+                return self._idle.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+
+    def render(self, figure, **options):
+        """Exports a Plotly figure (format, width, height, scale as in fig.to_image) and returns the bytes."""
+        figure_json = figure.to_json()
+        queued = time.perf_counter()
+        worker = self._acquire()
+        start = time.perf_counter()
+        try:
+            for attempt in range(2):
+                if not worker.is_alive():
+                    worker = self._replace(worker)
+                    if worker is None:
+                        raise RenderError("Renderer process could not be restarted.")
+                try:
+                    status, payload = worker.request((figure_json, options), self.render_timeout)
+                except (TimeoutError, EOFError, OSError):
+                    # Hung or crashed mid-render: swap in a fresh process and retry once
+                    worker = self._replace(worker)
+                    if worker is None:
+                        raise RenderError("Renderer process could not be restarted.") from None
+                    continue
+                if status != "ok":
+                    raise RenderError(payload)
+                self._record(start - queued, time.perf_counter() - start)
+                return payload
+            raise RenderError("Renderer process failed twice.")
+        except Exception:
+            with self._metrics_lock:
+                self._counters["failures"] += 1
+            raise
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+
+    def _record(self, waited, seconds):
+        with self._metrics_lock:
+            self._counters["renders"] += 1
+            self._counters["queue_wait_seconds"] += waited
+            self._durations.append(seconds)
+
+    def metrics(self):
+        """Counters plus timing statistics over the most recent renders."""
+        with self._metrics_lock:
+            metrics = dict(self._counters, size=self.size, live=self._live, idle=self._idle.qsize())
+            if self._durations:
+                metrics["last_seconds"] = self._durations[-1]
+            durations = sorted(self._durations)
+        if durations:
+            metrics["median_seconds"] = statistics.median(durations)
+            # Nearest-rank percentile: the smallest duration at or above 95% of the renders
+            metrics["p95_seconds"] = durations[math.ceil(0.95 * len(durations)) - 1]
+        return metrics
+
+    def health_check(self):
+        """Pings every idle process and replaces the ones that do not answer."""
+        for _ in range(self._idle.qsize()):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if worker.request("ping", self.render_timeout)[0] != "pong":
+                    raise EOFError
+            except (TimeoutError, EOFError, OSError):
+                # A slot whose replacement fails to start is refilled by the next _fill()
+                worker = self._replace(worker)
+            if worker is not None:
+                self._idle.put(worker)
+
+    def close(self):
+        self._closed.set()
+        with self._metrics_lock:
+            live = self._live
+        for _ in range(live):
+            try:
+                self._idle.get(timeout=self.render_timeout).stop()
+            except queue.Empty:
+                break
+
+
+if __name__ == "__main__":
+    _worker_main()
@@ -0,0 +1,265 @@
+import os
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from components.cleaning import (
+    OUTLIER_Z_CUTOFF,
+    TYPE_INFERENCE_SAMPLE_SIZE,
+    drop_missing_rows,
+    infer_column_type,
+    missing_value_report,
+    optimize_dtypes,
+    type_inference_report,
+)
+
+
+# Spellings pandas' C parser reads as booleans
+BOOLEAN_VALUES = {"True": True, "TRUE": True, "true": True, "False": False, "FALSE": False, "false": False}
+
+
+# Function to coerce one chunk's raw string column to the type decided for the whole file
+def coerce_chunk_column(values, inferred, datetime_format):
+    if inferred == "boolean":
+        return values.map(BOOLEAN_VALUES, na_action="ignore").astype("boolean")
+    if inferred == "numeric":
+        return pd.to_numeric(values.str.replace(',', ''), errors="coerce").astype("float64")
+    if inferred == "datetime":
+        return pd.to_datetime(values, format=datetime_format, errors="coerce")
+    # Capitalize the first letter of each cell in string columns
+    return values.str.capitalize()
+
+
+# Function to pick a column's type from the non-null values of one chunk
+def infer_chunk_column(values):
+    """Returns ((inferred, datetime_format), values sampled).
+
+    Booleans are recognized the way the C parser reads them, since clean_data never
+    sees them as strings.
+    """
+    if not values.empty and values.isin(BOOLEAN_VALUES).all():
+        return ("boolean", None), len(values)
+    if len(values) > TYPE_INFERENCE_SAMPLE_SIZE:
+        values = values.sample(TYPE_INFERENCE_SAMPLE_SIZE, random_state=0)
+    return infer_column_type(values), len(values)
+
+
+class _Retype(Exception):
+    """A chunk shows a column needs a type other than the one pass one is coercing it to."""
+
+    def __init__(self, column, column_type, sampled):
+        super().__init__(column)
+        self.column = column
+        self.column_type = column_type
+        self.sampled = sampled
+
+
+# Function to run the row-local cleaning steps over every chunk and spool the survivors
+def _first_pass(file, chunk_rows, subset, spool, forced_types):
+    """Returns the state pass two and the report need, or raises _Retype.
+
+    forced_types maps columns to the (type, sampled) a previous attempt settled on.
+    """
+    state = {
+        "columns": [],
+        "column_types": {},
+        "timings": {},
+        "has_commas": {},
+        "integral": {},
+        "duplicates": 0,
+        "missing_parts": [],
+        "rows_read": 0,
+        "spooled": [],
+        "numeric_cols": [],
+    }
+    column_types = state["column_types"]
+    # Columns with no values in the chunks read so far; typed from the first chunk that has some
+    pending = set()
+    seen_hashes = np.empty(0, dtype=np.uint64)
+    # Per-column running count, mean and sum of squared deviations (Chan et al. merge)
+    stats_n = stats_mean = stats_m2 = None
+
+    for chunk in pd.read_csv(file, chunksize=chunk_rows, dtype="string"):
+        state["rows_read"] += chunk.shape[0]
+        if not column_types:
+            state["columns"] = chunk.columns.tolist()
+            for col in state["columns"]:
+                start = time.perf_counter()
+                if col in forced_types:
+                    column_types[col], sampled = forced_types[col]
+                else:
+                    values = chunk[col].dropna()
+                    column_types[col], sampled = infer_chunk_column(values)
+                    if values.empty:
+                        pending.add(col)
+                state["timings"][col] = {"sampled": sampled, "seconds": time.perf_counter() - start}
+                state["has_commas"][col] = False
+                state["integral"][col] = True
+            state["numeric_cols"] = [col for col in state["columns"] if column_types[col][0] == "numeric"]
+            stats_n = np.zeros(len(state["numeric_cols"]))
+            stats_mean = np.zeros(len(state["numeric_cols"]))
+            stats_m2 = np.zeros(len(state["numeric_cols"]))
+        else:
+            for col in [col for col in pending if chunk[col].notna().any()]:
+                pending.discard(col)
+                column_type, sampled = infer_chunk_column(chunk[col].dropna())
+                if column_type[0] not in ("categorical", "text"):
+                    # Earlier chunks were coerced as text; start over with the type this chunk shows
+                    raise _Retype(col, column_type, sampled)
+                column_types[col] = column_type
+                state["timings"][col]["sampled"] = sampled
+
+        # Row-local steps: type coercion and string normalization
+        for col in state["columns"]:
+            start = time.perf_counter()
+            raw = chunk[col]
+            inferred = column_types[col][0]
+            chunk[col] = coerce_chunk_column(raw, *column_types[col])
+            if inferred in ("boolean", "numeric", "datetime") and (raw.notna() & chunk[col].isna()).any():
+                # Like clean_data, a column that does not fully convert is kept as text instead
+                raise _Retype(col, ("text", None), state["timings"][col]["sampled"])
+            if inferred == "numeric":
+                state["has_commas"][col] |= bool(raw.str.contains(",", regex=False).any())
+                values = chunk[col].dropna().to_numpy()
+                state["integral"][col] &= bool((values == np.round(values)).all())
+            state["timings"][col]["seconds"] += time.perf_counter() - start
+
+        # Duplicates are judged against every row kept from earlier chunks
+        row_hashes = pd.util.hash_pandas_object(chunk[subset] if subset else chunk, index=False).to_numpy()
+        duplicated = pd.Series(row_hashes).duplicated().to_numpy()
+        if seen_hashes.size:
+            positions = np.searchsorted(seen_hashes, row_hashes).clip(max=seen_hashes.size - 1)
+            duplicated |= seen_hashes[positions] == row_hashes
+        state["duplicates"] += int(duplicated.sum())
+        seen_hashes = np.sort(np.concatenate([seen_hashes, row_hashes[~duplicated]]), kind="stable")
+        chunk = chunk[~duplicated]
+
+        chunk, missing_rows = drop_missing_rows(chunk)
+        state["missing_parts"].append(missing_rows)
+
+        if state["numeric_cols"] and not chunk.empty:
+            values = chunk[state["numeric_cols"]].to_numpy(dtype=float)
+            n = values.shape[0]
+            mean = values.mean(axis=0)
+            m2 = ((values - mean) ** 2).sum(axis=0)
+            total = stats_n + n
+            delta = mean - stats_mean
+            stats_m2 = stats_m2 + m2 + delta ** 2 * stats_n * n / total
+            stats_mean = stats_mean + delta * n / total
+            stats_n = total
+
+        path = os.path.join(spool, f"chunk-{len(state['spooled'])}.pkl")
+        chunk.to_pickle(path)
+        state["spooled"].append(path)
+        del chunk
+
+    state["stats"] = (stats_n, stats_mean, stats_m2)
+    return state
+
+
+# Function to clean a CSV chunk by chunk so peak memory does not grow with the raw file
+def clean_csv_in_chunks(data, chunk_rows, outlier_mode="combined", duplicate_keys=None, hash_duplicates=False):
+    """Streaming counterpart of clean_data with the same report and details.
+
+    data holds the raw CSV bytes. Pass one reads the CSV in chunks of chunk_rows, applies the row-local steps (type
+    coercion, string normalization, missing-value removal), drops duplicates against a
+    sorted array of 64-bit row hashes and accumulates per-column mean/variance. The
+    chunks are spooled to a temporary directory, and pass two filters Z-score outliers
+    with the global statistics before the survivors are concatenated.
+
+    Column types are inferred from the first chunk, or for a column that chunk leaves
+    empty, from the first chunk with values in it. If a later chunk holds a value that
+    does not fit, or shows an empty column is numeric, datetime or boolean, pass one
+    starts over with that type, keeping a column that does not fully convert as text
+    as clean_data does. Whole-number columns stay integers, like the C parser's Int64.
+    Outliers are always removed in "combined" mode since the sequential mode needs the
+    whole frame.
+    """
+    cleaning_report = []
+    cleaning_details = {}
+    subset = list(duplicate_keys) if duplicate_keys else None
+    forced_types = {}
+
+    with tempfile.TemporaryDirectory(prefix="datagenie-") as spool:
+        while True:
+            try:
+                # A fresh reader per attempt: pandas closes the buffer when a pass stops early
+                state = _first_pass(BytesIO(data), chunk_rows, subset, spool, forced_types)
+                break
+            except _Retype as retype:
+                forced_types[retype.column] = (retype.column_type, retype.sampled)
+                for name in os.listdir(spool):
+                    os.remove(os.path.join(spool, name))
+        columns = state["columns"]
+        column_types = state["column_types"]
+        numeric_cols = state["numeric_cols"]
+        stats_n, stats_mean, stats_m2 = state["stats"]
+        # Booleans and numbers without thousands separators are parsed natively by clean_data's reader, not inferred
+        native_cols = {col for col in numeric_cols if not state["has_commas"][col]}
+        native_cols.update(col for col in columns if column_types[col][0] == "boolean")
+
+        inference = []
+        for col in columns:
+            if col in native_cols:
+                continue
+            inferred, datetime_format = column_types[col]
+            result = {
+                "column": col,
+                "sampled": state["timings"][col]["sampled"],
+                "inferred": inferred,
+                "format": datetime_format,
+                "fell_back": col in forced_types and forced_types[col][0][0] == "text",
+                "seconds": state["timings"][col]["seconds"],
+            }
+            inference.append(result)
+            cleaning_report.extend(type_inference_report(result))
+        cleaning_details["type_inference"] = inference
+
+        if state["duplicates"]:
+            on = f" on key columns {', '.join(subset)}" if subset else ""
+            cleaning_report.append(f"Removed {state['duplicates']} duplicate rows{on}.")
+
+        missing_parts = state["missing_parts"]
+        missing_rows = pd.concat(missing_parts) if missing_parts else pd.DataFrame(columns=columns, dtype=bool)
+        cleaning_report.extend(missing_value_report(missing_rows))
+        cleaning_details["missing_values"] = missing_rows
+
+        # Pass two: filter outliers with the statistics of the whole file
+        if outlier_mode != "combined":
+            cleaning_report.append("Streaming ingest removes outliers in combined mode only.")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cutoff = np.sqrt(stats_m2 / (stats_n - 1)) * OUTLIER_Z_CUTOFF if numeric_cols else None
+        outlier_counts = np.zeros(len(numeric_cols), dtype=int)
+        kept = []
+        for path in state["spooled"]:
+            chunk = pd.read_pickle(path)
+            if numeric_cols and not chunk.empty:
+                values = chunk[numeric_cols].to_numpy(dtype=float)
+                within = (values >= stats_mean - cutoff) & (values <= stats_mean + cutoff)
+                outlier_counts += (~within).sum(axis=0)
+                chunk = chunk[within.all(axis=1)]
+            kept.append(chunk)
+        for col, count in zip(numeric_cols, outlier_counts):
+            if count:
+                cleaning_report.append(f"Removed {count} outliers in column '{col}'.")
+
+    df = pd.concat(kept) if kept else pd.DataFrame(columns=columns)
+    del kept
+    # Give numbers the dtypes clean_data ends up with: Int64 or Float64 from the parser, float from inference
+    number_dtypes = {
+        col: "float64" if col not in native_cols else "Int64" if state["integral"][col] else "Float64"
+        for col in numeric_cols
+    }
+    # Categories are assigned once on the combined frame so every chunk shares them
+    categorical_cols = [col for col in columns if column_types[col][0] == "categorical"]
+    df = df.astype({**number_dtypes, **{col: "category" for col in categorical_cols}})
+
+    # Store repeated labels as categories and numbers in the smallest width that holds them
+    df, memory_report, cleaning_details["memory"] = optimize_dtypes(df)
+    cleaning_report.extend(memory_report)
+
+    cleaning_report.append(f"Original shape was {(state['rows_read'], len(columns))}, cleaned shape is {df.shape}.")
+    return df, cleaning_report, cleaning_details
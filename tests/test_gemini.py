@@ -0,0 +1,225 @@
+import asyncio
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from components import gemini
+from components.gemini import CircuitOpenError, GeminiClient, TokenBucket
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text] if text else []
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel: answers with the prompt, after the scripted failures."""
+
+    def __init__(self, model_id, failures=(), delays=None):
+        self.model_id = model_id
+        self.failures = list(failures)
+        self.delays = delays or {}
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _next(self, parts, options):
+        self.calls.append((parts, options))
+        if self.failures:
+            raise self.failures.pop(0)
+        return Chunk(f"insight: {parts[0]}")
+
+    def generate_content(self, parts, stream=False, **options):
+        response = self._next(parts, options)
+        if stream:
+            return [Chunk("insight: "), Chunk(""), Chunk(parts[0])]
+        return response
+
+    async def generate_content_async(self, parts, **options):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(parts[0], 0))
+            return self._next(parts, options)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(gemini, "BACKOFF_BASE_SECONDS", 0)
+
+
+def make_client(failures=(), delays=None, **options):
+    models = []
+
+    def factory(model_id):
+        models.append(StubModel(model_id, failures, delays))
+        return models[-1]
+
+    return GeminiClient("stub-model", model_factory=factory, **options), models
+
+
+def test_model_is_created_on_first_use():
+    client, models = make_client()
+
+    assert models == []
+    client.model()
+    assert len(models) == 1
+    assert models[0].model_id == "stub-model"
+
+
+def test_generate_reuses_one_model_and_passes_options():
+    client, models = make_client()
+
+    assert client.generate(["first"]).text == "insight: first"
+    assert client.generate(["second"], generation_config={"temperature": 0}).text == "insight: second"
+
+    assert len(models) == 1
+    assert models[0].calls[1][1] == {"request_options": {"timeout": 60}, "generation_config": {"temperature": 0}}
+
+
+def test_each_attempt_gets_the_client_timeout():
+    client, models = make_client(timeout=12)
+
+    client.generate(["chart"])
+
+    assert models[0].calls[0][1] == {"request_options": {"timeout": 12}}
+
+
+def test_stream_yields_the_text_of_chunks_with_content():
+    client, _ = make_client()
+
+    assert list(client.stream(["chart"])) == ["insight: ", "chart"]
+
+
+def test_generate_many_keeps_request_order_and_limits_concurrency():
+    delays = {"slow": 0.2, "fast": 0.0, "medium": 0.1}
+    client, models = make_client(delays=delays)
+
+    results = client.generate_many([["slow"], ["fast"], ["medium"]], concurrency=2)
+
+    assert [text for text, _ in results] == ["insight: slow", "insight: fast", "insight: medium"]
+    # Each request reports its own latency, not the batch's
+    assert results[0][1] >= 0.2
+    assert results[1][1] < 0.1
+    assert models[0].max_in_flight == 2
+
+
+def test_generate_many_returns_failures_in_place():
+    client, _ = make_client(failures=[ValueError("bad request")])
+
+    results = client.generate_many([["first"], ["second"]], concurrency=1)
+
+    assert isinstance(results[0][0], ValueError)
+    assert results[1][0] == "insight: second"
+
+
+def test_transient_failures_are_retried():
+    client, models = make_client(failures=[google_exceptions.ResourceExhausted("quota")] * 2, max_retries=3)
+
+    assert client.generate(["chart"]).text == "insight: chart"
+
+    assert len(models[0].calls) == 3
+    metrics = client.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["failures"] == 0
+    assert metrics["circuit"] == "closed"
+
+
+def test_retries_stop_after_max_retries():
+    client, models = make_client(failures=[google_exceptions.ResourceExhausted("quota")] * 5, max_retries=2)
+
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        client.generate(["chart"])
+
+    assert len(models[0].calls) == 3
+    assert client.metrics()["failures"] == 1
+
+
+def test_retries_stop_at_the_request_deadline(monkeypatch):
+    monkeypatch.setattr(gemini, "BACKOFF_BASE_SECONDS", 1)
+    monkeypatch.setattr(gemini.random, "uniform", lambda low, high: high)
+    client, models = make_client(failures=[google_exceptions.ResourceExhausted("quota")] * 5, max_retries=4,
+                                 deadline=0.3)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        client.generate(["chart"])
+
+    assert time.monotonic() - start < 0.5
+    assert len(models[0].calls) == 1
+    assert client.metrics()["failures"] == 1
+
+
+def test_throttling_waits_no_longer_than_the_deadline():
+    client, models = make_client(rate_per_minute=1, deadline=0.2)
+    client.generate(["first"])
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        client.generate(["second"])
+
+    assert time.monotonic() - start < 0.4
+    assert len(models[0].calls) == 1
+
+
+def test_attempts_get_what_is_left_of_the_deadline():
+    client, models = make_client(failures=[google_exceptions.ServiceUnavailable("down")], timeout=60, deadline=5)
+
+    client.generate(["chart"])
+
+    timeouts = [options["request_options"]["timeout"] for _, options in models[0].calls]
+    assert len(timeouts) == 2
+    assert all(timeout <= 5 for timeout in timeouts)
+
+
+def test_other_errors_are_not_retried():
+    client, models = make_client(failures=[google_exceptions.InvalidArgument("bad request")])
+
+    with pytest.raises(google_exceptions.InvalidArgument):
+        client.generate(["chart"])
+
+    assert len(models[0].calls) == 1
+
+
+def test_breaker_counts_a_retried_request_once():
+    failures = [google_exceptions.ResourceExhausted("quota")] * 3
+    client, _ = make_client(failures=failures, max_retries=2, breaker_threshold=2)
+
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        client.generate(["chart"])
+
+    assert client.metrics()["circuit"] == "closed"
+    assert client.generate(["chart"]).text == "insight: chart"
+
+
+def test_breaker_fails_fast_then_lets_a_trial_request_through():
+    failures = [google_exceptions.ServiceUnavailable("down")] * 2
+    client, models = make_client(failures=failures, max_retries=0, breaker_threshold=2, breaker_reset_seconds=0.1)
+
+    for _ in range(2):
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            client.generate(["chart"])
+    with pytest.raises(CircuitOpenError):
+        client.generate(["chart"])
+
+    assert len(models[0].calls) == 2
+    assert client.metrics()["rejected"] == 1
+    assert client.metrics()["circuit"] == "open"
+
+    time.sleep(0.1)
+    assert client.generate(["chart"]).text == "insight: chart"
+    assert client.metrics()["circuit"] == "closed"
+
+
+def test_token_bucket_queues_requests_beyond_the_burst():
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.1, abs=0.01)
+    assert waits[3] == pytest.approx(0.2, abs=0.01)
@@ -0,0 +1,30 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from components.pdf_report import build_pdf_report, format_insights
+
+
+def make_png():
+    buf = BytesIO()
+    Image.new("RGB", (70, 50), "white").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_model_text_is_escaped():
+    html = format_insights("**Total** & <b>units</b>\n* <img src=x>")
+
+    assert html == "<p><strong>Total</strong> &amp; &lt;b&gt;units&lt;/b&gt;</p><ul><li>&lt;img src=x&gt;</li></ul>"
+
+
+@pytest.mark.parametrize("insights", [
+    "Revenue rose 5 € &#8364; &#99999999;",
+    "</ul> closes nothing",
+    "<img src=missing.png> <img src='http://example.com/chart.png'>",
+    "**Bold** — “quoted”\n* first\n* second\n*note",
+])
+def test_untrusted_insights_still_give_a_pdf(insights):
+    pdf = build_pdf_report(insights, make_png())
+
+    assert pdf.startswith(b"%PDF")
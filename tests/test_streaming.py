@@ -0,0 +1,39 @@
+from io import BytesIO
+
+import pandas as pd
+
+from components.cleaning import clean_data, read_csv_upload
+from components.streaming import clean_csv_in_chunks
+
+
+def make_csv(rows=60, empty_rows=10):
+    # Columns b, e and f have no values in the first chunk; c holds booleans
+    lines = ["a,b,c,d,e,f"]
+    for i in range(rows):
+        late = i >= empty_rows
+        b = str(i % 7) if late else ""
+        e = f"{i / 8:.3f}" if late else ""
+        f = ("north", "south", "east")[i % 3] if late else ""
+        lines.append(f"{i},{b},{'True' if i % 2 else 'False'},{'xy'[i % 2]},{e},{f}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def test_chunked_cleaning_gives_the_in_memory_dtypes():
+    data = make_csv()
+
+    expected, expected_report, _ = clean_data(read_csv_upload(BytesIO(data)))
+    streamed, streamed_report, _ = clean_csv_in_chunks(data, 10)
+
+    assert streamed.dtypes.astype(str).to_dict() == expected.dtypes.astype(str).to_dict()
+    assert streamed_report == expected_report
+    pd.testing.assert_frame_equal(streamed.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_a_late_value_that_does_not_fit_keeps_the_column_as_text():
+    data = make_csv() + b"60,seven,True,x,1.0,north\n"
+
+    expected, _, _ = clean_data(read_csv_upload(BytesIO(data)))
+    streamed, _, details = clean_csv_in_chunks(data, 10)
+
+    assert streamed["b"].dtype == expected["b"].dtype == "category"
+    assert {r["column"]: r["fell_back"] for r in details["type_inference"]}["b"]